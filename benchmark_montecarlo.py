@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import yestrader_montecarlo as mc
+
+# Grid of sizes covered by a full run (simulations x days)
+DEFAULT_SIMULATIONS = [1000, 10000, 100000, 1000000]
+DEFAULT_DAYS = [250, 1000, 5000]
+QUICK_SIMULATIONS = [1000, 10000]
+QUICK_DAYS = [250, 1000]
+
+# Path counts of the resampling throughput benchmark, the same for every resampling scheme
+DEFAULT_RESAMPLING_SIMULATIONS = [10000, 100000, 1000000]
+QUICK_RESAMPLING_SIMULATIONS = [10000, 100000]
+
+STAGES = ['resample', 'cumsum', 'metrics', 'max_underwater_period', 'percentile_bands', 'exact', 'plot']
+
+# Timer for one stage: wall time and peak memory allocated on top of what was live when the stage started
+class StageTimer:
+    def __init__(self):
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds += time.perf_counter() - self.start_time
+        self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1] - self.start_bytes)
+
+    def as_dict(self):
+        return {'seconds': self.seconds, 'peak_bytes': int(self.peak_bytes)}
+
+# Function to generate a synthetic daily PnL series in points (fat tails, some flat days, 0.1 Pt ticks)
+def synthetic_returns(num_days, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_t(df=4, size=num_days) * 8 + 0.5
+    returns[rng.random(num_days) < 0.1] = 0  # Days without a trade
+    return np.round(returns, 1)
+
+# Function to time loading a synthetic period-analysis export, parsed from Excel and from the cache
+def benchmark_excel_load(num_days, work_dir):
+    file_path = os.path.join(work_dir, f"synthetic_{num_days}.xlsx")
+    data = pd.DataFrame({'일자': pd.date_range('2000-01-03', periods=num_days, freq='B'),
+                         '손익': synthetic_returns(num_days)})
+    data.to_excel(file_path, index=False)
+
+    timings = {'num_days': num_days}
+    for name, use_cache in [('parse', False), ('cache_miss', True), ('cache_hit', True)]:
+        with StageTimer() as timer:
+            mc.load_returns(file_path, use_cache=use_cache)
+        timings[name] = timer.as_dict()
+    return timings
+
+# Function to time every stage of the simulation pipeline for one grid cell
+def benchmark_pipeline(num_simulations, num_days, chunk_size=None, seed=0):
+    """ Runs the same steps as simulate_chunks, chunk by chunk, timing each stage separately.
+    'metrics' is the full per-path metric stage (it includes the underwater kernel), while
+    'max_underwater_period' times the kernel alone on the same chunk. """
+    returns = synthetic_returns(num_days, seed)
+    years = num_days / 252
+    initial_value = 4000.0
+    chunk_size = chunk_size or mc.default_chunk_size(num_days)
+    rng = np.random.default_rng(seed)
+    timers = {stage: StageTimer() for stage in STAGES}
+
+    band_sketch = mc.DailyQuantileSketch.from_returns(returns)
+    metric_chunks = []
+    sample_paths = None
+    total_start = time.perf_counter()
+    for start in range(0, num_simulations, chunk_size):
+        size = min(chunk_size, num_simulations - start)
+        with timers['resample']:
+            daily_returns = mc.resample_paths(rng, returns, size, num_days)
+        with timers['metrics']:
+            chunk_metrics = mc.compute_return_metrics(daily_returns)
+        with timers['cumsum']:
+            cumulative_pnl = np.cumsum(daily_returns, axis=1, out=daily_returns)
+        with timers['max_underwater_period']:
+            mc.max_underwater_periods(cumulative_pnl)
+        with timers['percentile_bands']:
+            band_sketch.add(cumulative_pnl)
+        if sample_paths is None:
+            sample_paths = cumulative_pnl[:20].copy()
+        with timers['metrics']:
+            chunk_metrics.update(mc.compute_path_metrics(cumulative_pnl, initial_value, years, in_place=True))
+        metric_chunks.append(chunk_metrics)
+        del daily_returns, cumulative_pnl
+
+    with timers['metrics']:
+        metrics = mc.merge_metrics(metric_chunks)
+    with timers['percentile_bands']:
+        band_sketch.quantiles(mc.BAND_PERCENTILES)
+    with timers['exact']:
+        exact = mc.exact_distributions(returns)
+    total_seconds = time.perf_counter() - total_start
+
+    result = mc.SimulationResult(returns=returns, num_simulations=num_simulations, initial_value=initial_value,
+                                 base_metrics=mc.compute_base_metrics(returns, initial_value), metrics=metrics,
+                                 band_sketch=band_sketch, sample_paths=sample_paths, sheet_name='benchmark',
+                                 exact=exact)
+    with timers['plot']:
+        render_plot(result)
+
+    return {
+        'num_simulations': num_simulations,
+        'num_days': num_days,
+        'chunk_size': chunk_size,
+        'simulation_seconds': total_seconds,
+        'stages': {stage: timer.as_dict() for stage, timer in timers.items()},
+    }
+
+# Function to time drawing the index matrices and gathering the returns of one resampling scheme
+def benchmark_resampling(num_simulations, num_days, resampling, block_length=mc.DEFAULT_BLOCK_LENGTH, chunk_size=None,
+                         seed=0):
+    """ Runs resample_indices and the gather chunk by chunk, as simulate_chunks does, so the time per
+    path does not depend on num_simulations; paths_per_second compares the schemes directly. """
+    returns = synthetic_returns(num_days, seed)
+    chunk_size = chunk_size or mc.default_chunk_size(num_days)
+    rng = np.random.default_rng(seed)
+    timings = {'resampling': resampling, 'num_simulations': num_simulations, 'num_days': num_days}
+    for stage in ('indices', 'gather'):
+        timings[stage] = 0.0
+    for start in range(0, num_simulations, chunk_size):
+        size = min(chunk_size, num_simulations - start)
+        start_time = time.perf_counter()
+        indices = mc.resample_indices(rng, num_days, size, num_days, resampling, block_length)
+        gather_time = time.perf_counter()
+        returns[indices]
+        timings['indices'] += gather_time - start_time
+        timings['gather'] += time.perf_counter() - gather_time
+        del indices
+    timings['paths_per_second'] = num_simulations / (timings['indices'] + timings['gather'])
+    return timings
+
+# Function to render the result plot off-screen, as the GUI would
+def render_plot(result):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if not hasattr(render_plot, 'plot'):
+        render_plot.plot = mc.SimulationPlot()
+        render_plot.canvas = FigureCanvasAgg(render_plot.plot.figure)
+    render_plot.plot.update(result)
+    render_plot.canvas.draw()
+
+# Function to describe the machine and library versions of a run
+def environment_info():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+# Function to compare a run with a baseline run and list the stages that got slower
+def compare_runs(baseline, current, threshold):
+    baseline_cells = {(cell['num_simulations'], cell['num_days']): cell for cell in baseline['pipeline']}
+    regressions = []
+    for cell in current['pipeline']:
+        key = (cell['num_simulations'], cell['num_days'])
+        if key not in baseline_cells:
+            continue
+        for stage, timing in cell['stages'].items():
+            baseline_timing = baseline_cells[key]['stages'].get(stage)
+            if not baseline_timing or baseline_timing['seconds'] <= 0:
+                continue
+            ratio = timing['seconds'] / baseline_timing['seconds']
+            print(f"{key[0]:>8} x {key[1]:>5}  {stage:<22} {baseline_timing['seconds']:9.4f}s -> "
+                  f"{timing['seconds']:9.4f}s  ({ratio:5.2f}x)")
+            if ratio > 1 + threshold:
+                regressions.append((key, stage, ratio))
+    return regressions
+
+# Function to run the benchmark grid, save it as JSON and optionally compare it with a previous run
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="몬테카를로 분석기 단계별 성능 측정")
+    parser.add_argument('--simulations', type=int, nargs='+', default=None, help="시뮬레이션 횟수 목록")
+    parser.add_argument('--days', type=int, nargs='+', default=None, help="일수 목록")
+    parser.add_argument('--quick', action='store_true', help="작은 격자로 빠르게 측정")
+    parser.add_argument('--resampling-simulations', type=int, nargs='+', default=None,
+                        help="리샘플링 방식별 처리량 측정에 쓸 시뮬레이션 횟수 목록")
+    parser.add_argument('--chunk-size', type=int, default=None, help="청크 크기 (기본값: 메모리 예산으로 계산)")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="결과 JSON 파일 경로")
+    parser.add_argument('--compare', default=None, help="비교할 이전 결과 JSON 파일")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="이 비율 이상 느려진 단계를 회귀로 표시 (기본값: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    simulations = args.simulations or (QUICK_SIMULATIONS if args.quick else DEFAULT_SIMULATIONS)
+    days = args.days or (QUICK_DAYS if args.quick else DEFAULT_DAYS)
+    resampling_simulations = args.resampling_simulations or (QUICK_RESAMPLING_SIMULATIONS if args.quick
+                                                             else DEFAULT_RESAMPLING_SIMULATIONS)
+
+    # 누락된 한글 글꼴 경고는 측정과 무관하므로 숨김
+    warnings.filterwarnings('ignore', message='Glyph .* missing from font')
+
+    tracemalloc.start()
+    benchmark_pipeline(100, 50)  # Warm-up, so the first grid cell is not charged for imports and font caches
+    run = {'environment': environment_info(), 'excel_load': [], 'pipeline': [], 'resampling': []}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 벤치마크가 실제 캐시 디렉터리를 건드리지 않도록 임시 디렉터리 사용
+        mc.RETURNS_CACHE_DIR = os.path.join(work_dir, 'cache')
+        for num_days in days:
+            run['excel_load'].append(benchmark_excel_load(num_days, work_dir))
+            print(f"excel load {num_days:>5} days: {run['excel_load'][-1]['parse']['seconds']:.3f}s", file=sys.stderr)
+
+    for num_days in days:
+        for num_simulations in simulations:
+            cell = benchmark_pipeline(num_simulations, num_days, args.chunk_size)
+            run['pipeline'].append(cell)
+            print(f"{num_simulations:>8} x {num_days:>5}: {cell['simulation_seconds']:.3f}s", file=sys.stderr)
+    tracemalloc.stop()
+
+    # 메모리 추적은 배열 연산을 느리게 하므로 끈 뒤에 측정
+    for num_days in days:
+        for num_simulations in resampling_simulations:
+            for resampling in mc.RESAMPLING_METHODS:
+                cell = benchmark_resampling(num_simulations, num_days, resampling, chunk_size=args.chunk_size)
+                run['resampling'].append(cell)
+                print(f"{resampling:>10} {num_simulations:>8} x {num_days:>5}: "
+                      f"{cell['paths_per_second']:,.0f} 경로/초", file=sys.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_runs(baseline, run, args.threshold)
+        for (num_simulations, num_days), stage, ratio in regressions:
+            print(f"회귀: {num_simulations} x {num_days} {stage} {ratio:.2f}x", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import yestrader_montecarlo as mc
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Largest request body accepted (a job is a few small fields)
+MAX_BODY_BYTES = 64 * 1024
+
+HTTP_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Error sent back to the client as a 4xx response
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# One submitted simulation; duplicates of a job share the same Job object
+class Job:
+    def __init__(self, job_id, key, params):
+        self.id = job_id
+        self.key = key
+        self.params = params
+        self.status = 'queued'  # queued -> running -> done | error
+        self.progress = 0  # Simulated paths so far, updated from the worker thread
+        self.submissions = 1
+        self.created = time.time()
+        self.requested = self.created  # Last time the job was submitted, for evicting the least recently used
+        self.finished = None
+        self.run_dir = None
+        self.summary = None
+        self.error = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress,
+            'submissions': self.submissions,
+            'seconds': (self.finished or time.time()) - self.created,
+            'run_dir': self.run_dir,
+            'summary': self.summary,
+            'error': self.error,
+        }
+
+# Function to check a job request and fill in the defaults of the optional fields
+def job_params(body):
+    if not isinstance(body, dict) or not body.get('file'):
+        raise RequestError(400, "'file' 이 필요합니다.")
+    try:
+        params = {
+            'file': str(body['file']),
+            'sheet': str(body['sheet']) if body.get('sheet') else None,
+            'simulations': int(body.get('simulations', 1000)),
+            'initial_value': float(body.get('initial_value', 4000)),
+            'seed': int(body['seed']) if body.get('seed') is not None else None,
+            'resampling': str(body.get('resampling') or 'iid'),
+            'block_length': int(body.get('block_length') or mc.DEFAULT_BLOCK_LENGTH),
+        }
+    except (TypeError, ValueError) as e:
+        raise RequestError(400, str(e))
+    if params['simulations'] <= 0 or params['initial_value'] <= 0:
+        raise RequestError(400, "시뮬레이션 횟수와 초기 자본은 양수여야 합니다.")
+    if params['resampling'] not in mc.RESAMPLING_METHODS or params['block_length'] < 1:
+        raise RequestError(400, f"리샘플링 방식은 {list(mc.RESAMPLING_METHODS)} 중 하나, 블록 길이는 1 이상이어야 합니다.")
+    if params['resampling'] == 'iid':
+        params['block_length'] = None  # Not used, so it must not split the cache
+    return params
+
+# Function to key a job by its inputs: the contents of the Excel file, the sheet and the settings
+def job_key(params):
+    """ Jobs without a seed are not reproducible, so they never share a key (None). """
+    if params['seed'] is None:
+        return None
+    parts = mc.file_cache_key(params['file'])[3:] + (params['sheet'] or "", params['simulations'],
+                                                      params['initial_value'], params['seed'],
+                                                      params['resampling'], params['block_length'])
+    return hashlib.sha256("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+# Asyncio HTTP service running simulation jobs from a queue on a pool of workers
+class JobServer:
+    """ POST /jobs with {"file", "sheet", "simulations", "initial_value", "seed"} and optionally
+    {"resampling", "block_length"} (see resample_indices) queues a job (or
+    returns the finished or running job with the same inputs, so duplicates are simulated once);
+    ?wait=1 answers only when the job is finished. GET /jobs/<id> reports a job, GET /jobs lists them.
+    Every result is saved to the run store and reported as its results table plus run_dir, which a
+    client on the same machine opens with open_run. """
+
+    def __init__(self, num_workers=1, simulation_workers=1, max_cached=256, store_dir=None):
+        self.num_workers = num_workers
+        self.simulation_workers = simulation_workers
+        self.max_cached = max_cached
+        self.store_dir = store_dir
+        self.jobs = {}  # id -> Job, for every job still cached or pending
+        self.jobs_by_key = {}  # key -> Job with those inputs
+        self.job_ids = itertools.count(1)
+        self.queue = None
+        self.executor = None
+
+    # Function to return the job for a request: an existing one with the same inputs, or a new queued one
+    def submit(self, params, key):
+        job = self.jobs_by_key.get(key) if key is not None else None
+        if job is not None and job.status != 'error':
+            job.submissions += 1
+            job.requested = time.time()
+            return job, True
+
+        job = Job(str(next(self.job_ids)), key, params)
+        self.jobs[job.id] = job
+        if key is not None:
+            self.jobs_by_key[key] = job
+        self.queue.put_nowait(job)
+        self.evict()
+        return job, False
+
+    # Function to forget the least recently requested finished jobs beyond max_cached (their runs stay stored)
+    def evict(self):
+        finished = [job for job in self.jobs.values() if job.status in ('done', 'error')]
+        for job in sorted(finished, key=lambda job: job.requested)[:max(len(finished) - self.max_cached, 0)]:
+            del self.jobs[job.id]
+            if job.key is not None and self.jobs_by_key.get(job.key) is job:
+                del self.jobs_by_key[job.key]
+
+    # Function running on a pool thread: load the returns, simulate and save the run
+    def run_job(self, job):
+        params = job.params
+        returns, sheet_name = mc.load_returns(params['file'], params['sheet'])
+
+        def progress(num_paths):
+            job.progress += num_paths
+
+        result = mc.simulate(returns, params['simulations'], params['initial_value'], seed=params['seed'],
+                             num_workers=self.simulation_workers, sheet_name=sheet_name,
+                             progress_callback=progress, capital_sweep=True, resampling=params['resampling'],
+                             block_length=params['block_length'] or mc.DEFAULT_BLOCK_LENGTH)
+        run_dir = mc.save_run(result, source=dict(params, job_key=job.key), store_dir=self.store_dir)
+        return run_dir, result.summary()
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            try:
+                job.run_dir, summary = await loop.run_in_executor(self.executor, self.run_job, job)
+                job.summary = json.loads(json.dumps(summary, default=float))
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'error'
+            job.finished = time.time()
+            job.done.set()
+            self.queue.task_done()
+
+    # Function to answer one HTTP request: returns (status, JSON-serialisable body)
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        query = parse_qs(url.query)
+
+        if path == '/health':
+            return 200, {'status': 'ok', 'queued': self.queue.qsize(), 'jobs': len(self.jobs)}
+        if path == '/jobs' and method == 'GET':
+            return 200, [job.to_dict() for job in self.jobs.values()]
+        if path == '/jobs' and method == 'POST':
+            try:
+                params = job_params(json.loads(body or b'null'))
+                # 파일 내용의 해시는 이벤트 루프를 막지 않도록 스레드에서 계산
+                key = await asyncio.get_running_loop().run_in_executor(None, job_key, params)
+                job, existing = self.submit(params, key)
+            except ValueError as e:
+                raise RequestError(400, str(e))
+            except OSError as e:
+                raise RequestError(404, str(e))
+            if query.get('wait', ['0'])[0] not in ('', '0'):
+                await job.done.wait()
+            return (200 if job.done.is_set() else 202), dict(job.to_dict(), existing=existing)
+        if path.startswith('/jobs/') and method == 'GET':
+            job = self.jobs.get(path[len('/jobs/'):])
+            if job is None:
+                raise RequestError(404, "작업을 찾을 수 없습니다.")
+            if query.get('wait', ['0'])[0] not in ('', '0'):
+                await job.done.wait()
+            return 200, job.to_dict()
+        if path in ('/health', '/jobs') or path.startswith('/jobs/'):
+            raise RequestError(405, f"{method} 은 지원하지 않습니다.")
+        raise RequestError(404, f"{path} 을 찾을 수 없습니다.")
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                if len(request_line) < 2:
+                    raise RequestError(400, "잘못된 요청입니다.")
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    raise RequestError(413, "요청이 너무 큽니다.")
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self.route(request_line[0].upper(), request_line[1], body)
+            except RequestError as e:
+                status, payload = e.status, {'error': str(e)}
+            except Exception as e:
+                status, payload = 500, {'error': str(e)}
+
+            content = json.dumps(payload, ensure_ascii=False, default=float).encode('utf-8')
+            writer.write(f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                         f"Content-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(content)}\r\nConnection: close\r\n\r\n".encode('latin-1') + content)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away
+        finally:
+            writer.close()
+
+    # Function to serve until cancelled; ready (a threading.Event) is set once the port is open
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.num_workers)]
+        server = await asyncio.start_server(self.handle, host, port)
+        self.address = server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Function to run the job server from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="몬테카를로 분석기 로컬 작업 서버")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"주소 (기본값: {DEFAULT_HOST}, 이 컴퓨터에서만 접속)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"포트 (기본값: {DEFAULT_PORT})")
+    parser.add_argument('--jobs', type=int, default=1, help="동시에 실행할 작업 수 (기본값: 1)")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="작업 하나의 병렬 작업 수 (기본값: 1)")
+    parser.add_argument('--max-cached', type=int, default=256, help="메모리에 기억할 완료 작업 수 (기본값: 256)")
+    args = parser.parse_args(argv)
+
+    server = JobServer(args.jobs, args.workers, args.max_cached)
+    print(f"작업 서버: http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 모듈을 설치 없이 import 할 수 있도록 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+# 0.25 Pt 단위라 누적 PnL 이 정확히 표현됨: 0.1 Pt 단위에서는 고점 회복일의 반올림 오차 (자본마다 다름) 로
+# underwater 일수가 드물게 달라짐
+RETURNS = np.round(np.random.default_rng(0).normal(0.4, 8, 250) * 4) / 4
+
+@pytest.fixture(scope='module')
+def swept_result():
+    return mc.simulate(RETURNS, 3000, 4000, seed=1, capital_sweep=True)
+
+# Function to compare the per-path metrics of a rescaled result with a fresh simulation of the scaled returns
+def assert_matches_simulation(result, initial_value, multiplier):
+    # Reference: simulate the PnL times the multiplier from the capital, with the same seed (same paths)
+    expected = mc.simulate(RETURNS * multiplier, 3000, initial_value, seed=1)
+    for key in ('final_pnl', 'final_value', 'cagr', 'max_drawdown', 'reward_ratio', 'win_probability',
+                'profit_loss_ratio', 'sharpe_ratio', 'max_underwater_period'):
+        np.testing.assert_allclose(result.metrics[key], expected.metrics[key], rtol=1e-9, atol=1e-9, err_msg=key)
+    assert result.initial_value == initial_value
+    np.testing.assert_allclose(result.returns, expected.returns, rtol=1e-12)
+    for key, value in expected.base_metrics.items():
+        assert result.base_metrics[key] == pytest.approx(value, rel=1e-9), key
+    for row, expected_row in zip(result.summary(), expected.summary()):
+        for column, value in expected_row.items():
+            if column != '지표':
+                assert row[column] == pytest.approx(value, rel=1e-9, abs=1e-9), (row['지표'], column)
+
+@pytest.mark.parametrize('initial_value, multiplier', [(4000, 1), (8000, 1), (1500, 1), (8000, 2), (3000, 0.5)])
+def test_with_capital_matches_simulation(swept_result, initial_value, multiplier):
+    assert_matches_simulation(swept_result.with_capital(initial_value, multiplier), initial_value, multiplier)
+
+def test_with_capital_of_rescaled_result(swept_result):
+    rescaled = swept_result.with_capital(8000, 2).with_capital(3000, 0.5)
+    assert_matches_simulation(rescaled, 3000, 0.5)
+
+def test_with_capital_needs_capital_sweep():
+    with pytest.raises(ValueError):
+        mc.simulate(RETURNS, 100, 4000, seed=1).with_capital(8000)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+RETURNS = np.round(np.random.default_rng(0).normal(0.4, 8, 150), 1)
+
+def labels(keys):
+    return {label for label, key, _, _, _ in mc.RESULT_ROWS if key in keys}
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_seeded_runs_are_reproducible(num_workers):
+    runs = [mc.simulate_until_converged(RETURNS, 4000, tolerance=1e-9, batch_size=400, max_simulations=1000, seed=5,
+                                        num_workers=num_workers, capital_sweep=True) for _ in range(2)]
+    for key in runs[0].metrics:
+        np.testing.assert_array_equal(runs[1].metrics[key], runs[0].metrics[key], err_msg=key)
+    np.testing.assert_array_equal(runs[1].band_sketch.counts, runs[0].band_sketch.counts)
+    np.testing.assert_array_equal(runs[1].sample_paths, runs[0].sample_paths)
+    assert runs[1].convergence == runs[0].convergence
+
+def test_batches_follow_the_seed_sequence():
+    result = mc.simulate_until_converged(RETURNS, 4000, tolerance=1e-9, batch_size=400, max_simulations=1000, seed=5)
+    # Reference: batch i uses the i-th child spawned from SeedSequence(seed)
+    root = np.random.SeedSequence(5)
+    batches = [mc.run_streaming_simulation(RETURNS, size, 4000, seed=root.spawn(1)[0])[0] for size in (400, 400, 200)]
+    np.testing.assert_array_equal(result.metrics['final_pnl'],
+                                  np.concatenate([batch['final_pnl'] for batch in batches]))
+    assert result.band_sketch.total == 1000
+
+def test_stops_at_max_simulations():
+    result = mc.simulate_until_converged(RETURNS, 4000, tolerance=1e-9, batch_size=400, max_simulations=1000, seed=5)
+    assert result.num_simulations == 1000
+    assert len(result.metrics['final_pnl']) == 1000
+    assert result.convergence['converged'] is False
+    assert [paths for paths, _ in result.convergence['history']] == [400, 800, 1000]
+    assert result.convergence['precision'] > 1e-9
+
+def test_stops_once_converged():
+    result = mc.simulate_until_converged(RETURNS, 4000, tolerance=10.0, batch_size=400, max_simulations=10000, seed=5)
+    assert result.convergence['converged'] is True
+    assert result.num_simulations == 400
+    assert result.convergence['precision'] <= 10.0
+
+@pytest.mark.parametrize('resampling', ['iid', 'block', 'stationary'])
+def test_exact_metrics_are_checked_only_when_sampled(resampling):
+    result = mc.simulate_until_converged(RETURNS, 4000, tolerance=1e-9, batch_size=300, max_simulations=300, seed=5,
+                                         resampling=resampling)
+    checked = set(result.convergence['metric_precision'])
+    sampled = {key for _, key, _, _, _ in mc.RESULT_ROWS} - set(mc.EXACT_METRICS)
+    assert labels(sampled) <= checked
+    if resampling == 'iid':
+        assert result.exact is not None
+        assert not checked & labels(mc.EXACT_METRICS)
+    else:
+        assert result.exact is None
+        assert labels(mc.EXACT_METRICS) <= checked
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+NUM_SAMPLES = 200000
+
+# Function to draw NUM_SAMPLES i.i.d. paths of num_days days from the returns, as the simulation does
+def sampled_paths(returns, num_days, seed=0):
+    rng = np.random.default_rng(seed)
+    return returns[rng.integers(0, len(returns), size=(NUM_SAMPLES, num_days))]
+
+def tick_returns():
+    # 0.1 Pt 틱, 손익이 없는 날 포함
+    rng = np.random.default_rng(1)
+    returns = np.round(rng.standard_t(df=4, size=120) * 8 + 0.5, 1)
+    returns[rng.random(120) < 0.1] = 0
+    return returns
+
+def tickless_returns():
+    return np.random.default_rng(2).normal(0.3, 5, 120)
+
+@pytest.mark.parametrize('returns_factory', [tick_returns, tickless_returns])
+def test_final_pnl_quantiles_match_sampling(returns_factory):
+    returns = returns_factory()
+    num_days = len(returns)
+    distribution = mc.exact_final_pnl_distribution(returns)
+    sample = sampled_paths(returns, num_days).sum(axis=1)
+
+    # 분위 추정 오차는 표준편차의 0.3% 정도이므로, 표준편차의 2% 와 격자 간격 하나를 허용
+    _, step, _ = mc.exact_grid(returns, num_days)
+    tolerance = 0.02 * sample.std() + step
+    np.testing.assert_allclose(distribution.quantiles(PERCENTILES), np.percentile(sample, PERCENTILES),
+                               rtol=0, atol=tolerance)
+
+def test_tickless_series_uses_the_coarsened_grid():
+    returns = tickless_returns()
+    assert mc.return_tick(returns) is None
+    low, step, num_bins = mc.exact_grid(returns, len(returns))
+    assert len(returns) * (num_bins - 1) + 1 <= mc.EXACT_MAX_POINTS
+    assert low + (num_bins - 1) * step == pytest.approx(returns.max())
+
+def test_tick_series_uses_the_tick_grid():
+    returns = tick_returns()
+    assert mc.return_tick(returns) == pytest.approx(0.1)
+    _, step, _ = mc.exact_grid(returns, len(returns))
+    assert step == pytest.approx(0.1)
+
+@pytest.mark.parametrize('returns_factory', [tick_returns, tickless_returns])
+@pytest.mark.parametrize('max_points', [mc.EXACT_MAX_POINTS, 1001])
+def test_final_pnl_mean_is_exact(returns_factory, max_points):
+    returns = returns_factory()
+    distribution = mc.exact_final_pnl_distribution(returns, max_points=max_points)
+    assert distribution.mean() == pytest.approx(len(returns) * returns.mean(), rel=1e-9, abs=1e-9)
+
+@pytest.mark.parametrize('value', [0.0, 2.5, -1.0])
+def test_constant_series(value):
+    returns = np.full(50, value)
+    exact = mc.exact_distributions(returns)
+    np.testing.assert_allclose(exact['final_pnl'].quantiles(PERCENTILES), 50 * value)
+    assert exact['final_pnl'].mean() == pytest.approx(50 * value)
+    expected_win_rate = 1.0 if value > 0 else 0.0
+    np.testing.assert_allclose(exact['win_probability'].quantiles(PERCENTILES), expected_win_rate)
+
+# 손익이 없으면 손익비, 샤프 지수가 inf 가 되어 (원래 루프와 동일) 그 분위 보간에서 경고가 발생
+@pytest.mark.filterwarnings('ignore:invalid value encountered in subtract:RuntimeWarning')
+def test_constant_series_results_table():
+    result = mc.simulate(np.zeros(30), 100, 4000, seed=0)
+    rows = {row['지표']: row for row in result.summary()}
+    assert rows["최종 PnL"]['50% 분위'] == 0
+    assert rows["CAGR"]['50% 분위'] == 0
+    assert rows["승률"]['50% 분위'] == 0
+
+def test_win_rate_distribution_matches_sampling():
+    returns = tick_returns()
+    num_days = len(returns)
+    daily = sampled_paths(returns, num_days, seed=3)
+    non_zero_days = np.count_nonzero(daily, axis=1)
+    sample = np.count_nonzero(daily > 0, axis=1) / non_zero_days
+
+    distribution = mc.exact_win_rate_distribution(returns)
+    assert distribution.mean() == pytest.approx(sample.mean(), abs=4 * sample.std() / np.sqrt(NUM_SAMPLES))
+    # 승률은 이산값이므로 인접한 값 하나 (1 / 비제로 일수) 정도의 차이를 허용
+    np.testing.assert_allclose(distribution.quantiles(PERCENTILES), np.percentile(sample, PERCENTILES),
+                               rtol=0, atol=1.5 / non_zero_days.min())
+
+def test_cagr_row_matches_sampled_cagr():
+    returns = tick_returns()
+    result = mc.simulate(returns, 50000, 200, seed=4)
+    _, exact_values = result.metric_statistics('cagr', PERCENTILES)
+    sampled_values = np.percentile(result.metrics['cagr'], PERCENTILES)
+    np.testing.assert_allclose(exact_values, sampled_values, rtol=0, atol=0.05 * result.metrics['cagr'].std())
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+METRIC_KEYS = ['win_probability', 'profit_loss_ratio', 'sharpe_ratio', 'cagr', 'max_drawdown',
+               'max_underwater_period', 'reward_ratio']
+
+# Reference: the per-path underwater loop of the original GUI code
+def reference_max_underwater_period(cumulative_returns):
+    running_max = np.maximum.accumulate(cumulative_returns)
+    underwater_periods = (running_max - cumulative_returns) > 0
+    underwater_durations = []
+    current_duration = 0
+    for period in underwater_periods:
+        if period:
+            current_duration += 1
+        else:
+            if current_duration > 0:
+                underwater_durations.append(current_duration)
+            current_duration = 0
+    if current_duration > 0:
+        underwater_durations.append(current_duration)
+    return max(underwater_durations) if underwater_durations else 0
+
+# Reference: the per-path metric loop of the original run_simulation, one path at a time
+def reference_metrics(simulation_daily_returns, initial_value, years):
+    metrics = {key: [] for key in METRIC_KEYS}
+    for sim_daily_returns in simulation_daily_returns:
+        sim_cumulative_returns = initial_value + np.cumsum(sim_daily_returns)
+        final_pnl_sim = sim_cumulative_returns[-1]
+
+        sim_profitable_days = np.sum(sim_daily_returns > 0)
+        sim_non_zero_days = np.sum(sim_daily_returns != 0)
+        metrics['win_probability'].append(sim_profitable_days / sim_non_zero_days if sim_non_zero_days != 0 else 0)
+
+        sim_positive_returns = sim_daily_returns[sim_daily_returns > 0]
+        sim_negative_returns = sim_daily_returns[sim_daily_returns < 0]
+        average_profit = np.mean(sim_positive_returns) if len(sim_positive_returns) > 0 else 0
+        average_loss = np.mean(sim_negative_returns) if len(sim_negative_returns) > 0 else 0
+        metrics['profit_loss_ratio'].append(average_profit / abs(average_loss) if average_loss != 0 else float('inf'))
+
+        mean_return = np.mean(sim_daily_returns)
+        std_dev_return = np.std(sim_daily_returns)
+        metrics['sharpe_ratio'].append(mean_return / std_dev_return * np.sqrt(252 / 12)
+                                       if std_dev_return != 0 else float('inf'))
+
+        with np.errstate(all='ignore'):
+            metrics['cagr'].append((final_pnl_sim / initial_value)**(1 / years) - 1 if final_pnl_sim > initial_value else 0)
+
+            sim_running_max = np.maximum.accumulate(sim_cumulative_returns)
+            sim_drawdown = (sim_running_max - sim_cumulative_returns) / sim_running_max
+        sim_drawdown[sim_running_max == 0] = 0
+        metrics['max_drawdown'].append(np.max(sim_drawdown))
+
+        metrics['max_underwater_period'].append(reference_max_underwater_period(sim_cumulative_returns))
+        metrics['reward_ratio'].append(final_pnl_sim / abs(np.max(sim_running_max - sim_cumulative_returns))
+                                       if np.max(sim_drawdown) != 0 else float('inf'))
+    return {key: np.array(values, dtype=float) for key, values in metrics.items()}
+
+# The in-place route of simulate_chunks: return metrics, cumsum into the same matrix, then path metrics
+def chunk_route_metrics(simulation_daily_returns, initial_value, years):
+    daily_returns = simulation_daily_returns.copy()
+    metrics = mc.compute_return_metrics(daily_returns)
+    cumulative_pnl = np.cumsum(daily_returns, axis=1, out=daily_returns)
+    metrics.update(mc.compute_path_metrics(cumulative_pnl, initial_value, daily_returns.shape[1] / 252, in_place=True))
+    return metrics
+
+def metric_cases():
+    rng = np.random.default_rng(0)
+    return {
+        'random': (rng.normal(0.5, 10, (300, 500)).round(1), 4000.0),
+        'sparse': (rng.choice([-5.0, 0.0, 0.0, 3.0], (200, 50)), 10.0),
+        'all_zero': (np.zeros((5, 20)), 100.0),
+        'all_win': (np.ones((5, 20)), 100.0),
+        'all_loss': (-np.ones((5, 20)), 100.0),
+        'zero_initial_value': (rng.normal(0, 10, (100, 300)), 0.0),
+        'negative_initial_value': (rng.normal(0, 10, (100, 300)), -50.0),
+    }
+
+@pytest.mark.parametrize('case', list(metric_cases()))
+@pytest.mark.parametrize('route', ['compute_simulation_metrics', 'in_place'])
+def test_metrics_match_reference_loop(case, route):
+    simulation_daily_returns, initial_value = metric_cases()[case]
+    years = simulation_daily_returns.shape[1] / 252
+    expected = reference_metrics(simulation_daily_returns, initial_value, years)
+    with np.errstate(all='ignore'):
+        if route == 'compute_simulation_metrics':
+            actual = mc.compute_simulation_metrics(simulation_daily_returns, initial_value, years)
+        else:
+            actual = chunk_route_metrics(simulation_daily_returns, initial_value, years)
+    for key in METRIC_KEYS:
+        np.testing.assert_allclose(actual[key], expected[key], rtol=1e-12, atol=0, equal_nan=True, err_msg=key)
+
+@pytest.mark.parametrize('case', list(metric_cases()))
+def test_max_underwater_periods_match_reference_loop(case):
+    simulation_daily_returns, initial_value = metric_cases()[case]
+    cumulative_returns = initial_value + np.cumsum(simulation_daily_returns, axis=1)
+    expected = [reference_max_underwater_period(row) for row in cumulative_returns]
+    np.testing.assert_array_equal(mc.max_underwater_periods(cumulative_returns), expected)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import yestrader_montecarlo as mc
+
+# 0.25 Pt 단위라 합계가 반올림 없이 정확함
+TABLE = np.round(np.random.default_rng(0).normal(0.4, 8, (250, 3)) * 4) / 4
+
+@pytest.mark.parametrize('num_workers, resampling', [(1, 'iid'), (2, 'iid'), (1, 'stationary')])
+def test_single_strategy_portfolio_equals_simulate(num_workers, resampling):
+    returns = TABLE[:, 0]
+    results = mc.simulate_portfolio(pd.DataFrame({'A': returns}), 2000, 4000, seed=3, num_workers=num_workers,
+                                    chunk_size=700, capital_sweep=True, resampling=resampling)
+    assert list(results) == ['A', mc.PORTFOLIO_NAME]
+    expected = mc.simulate(returns, 2000, 4000, seed=3, num_workers=num_workers, chunk_size=700,
+                           capital_sweep=True, resampling=resampling)
+    for name, result in results.items():
+        assert result.metrics.keys() == expected.metrics.keys()
+        for key in expected.metrics:
+            np.testing.assert_array_equal(result.metrics[key], expected.metrics[key], err_msg=f"{name} {key}")
+        assert result.summary() == expected.summary()
+    np.testing.assert_array_equal(results[mc.PORTFOLIO_NAME].band_sketch.counts, expected.band_sketch.counts)
+    np.testing.assert_array_equal(results[mc.PORTFOLIO_NAME].sample_paths, expected.sample_paths)
+
+@pytest.mark.parametrize('resampling', ['iid', 'block'])
+def test_strategy_final_pnl_sums_to_portfolio(resampling):
+    results = mc.simulate_portfolio(TABLE, 2000, 4000, seed=4, chunk_size=700, resampling=resampling)
+    assert list(results) == ["전략 1", "전략 2", "전략 3", mc.PORTFOLIO_NAME]
+    strategy_pnl = sum(results[name].metrics['final_pnl'] for name in ["전략 1", "전략 2", "전략 3"])
+    np.testing.assert_array_equal(strategy_pnl, results[mc.PORTFOLIO_NAME].metrics['final_pnl'])
+    # 플롯 밴드는 포트폴리오 결과에만 있음
+    assert results["전략 1"].band_sketch is None
+    assert results[mc.PORTFOLIO_NAME].band_sketch.total == 2000
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+BLOCK_METHODS = ['block', 'stationary']
+
+# Function to compute the fraction of days that continue the previous day's run (next day, wrapping around)
+def continuity(indices, num_returns):
+    indices = indices.astype(np.int64)
+    return np.mean(indices[:, 1:] == (indices[:, :-1] + 1) % num_returns)
+
+@pytest.mark.parametrize('resampling, num_returns, num_days, dtype', [
+    # 블록: 시작점 + 블록 안의 날이 2 * 수익률 수 미만이어야 int16
+    ('block', 16384, 500, np.int16),
+    ('block', 16385, 500, np.int32),
+    # 정상 블록: 시작점 - 블록이 시작하는 날 + 날짜가 수익률 수 + 일수 미만이어야 int16
+    ('stationary', 16384, 16384, np.int16),
+    ('stationary', 16384, 16385, np.int32),
+    ('stationary', 16383, 16385, np.int16),
+])
+def test_indices_in_range_at_dtype_boundaries(resampling, num_returns, num_days, dtype):
+    rng = np.random.default_rng(0)
+    indices = mc.resample_indices(rng, num_returns, 64, num_days, resampling, block_length=4096)
+    assert indices.shape == (64, num_days)
+    assert indices.dtype == dtype
+    assert indices.min() >= 0 and indices.max() < num_returns
+    # 블록이 많이 끝을 넘어가므로 감싸기가 실제로 일어나야 함
+    assert continuity(indices, num_returns) > 0.99
+
+@pytest.mark.parametrize('resampling', BLOCK_METHODS)
+@pytest.mark.parametrize('num_returns, block_length', [(50, 20), (50, 200), (7, 3)])
+def test_indices_in_range_for_more_days_than_returns(resampling, num_returns, block_length):
+    indices = mc.resample_indices(np.random.default_rng(1), num_returns, 200, 500, resampling, block_length)
+    assert indices.shape == (200, 500)
+    assert indices.min() >= 0 and indices.max() < num_returns
+
+@pytest.mark.parametrize('resampling', BLOCK_METHODS)
+@pytest.mark.parametrize('block_length', [2, 5, 20])
+def test_in_block_continuity(resampling, block_length):
+    num_returns = 1000
+    indices = mc.resample_indices(np.random.default_rng(2), num_returns, 2000, 250, resampling, block_length)
+    # 새 블록이 우연히 이어지는 확률 1 / 수익률 수 도 포함
+    expected = 1 - 1 / block_length + 1 / (block_length * num_returns)
+    assert continuity(indices, num_returns) == pytest.approx(expected, abs=0.01)
+
+@pytest.mark.parametrize('num_returns, dtype', [(250, np.int16), (32768, np.int16), (32769, np.int32)])
+def test_iid_stream_is_unchanged(num_returns, dtype):
+    # Reference: the i.i.d. draw before the block schemes were added
+    expected = np.random.default_rng(3).integers(0, num_returns, size=(100, 300), dtype=dtype)
+    indices = mc.resample_indices(np.random.default_rng(3), num_returns, 100, 300)
+    assert indices.dtype == dtype
+    np.testing.assert_array_equal(indices, expected)
+    # 블록 길이 1 은 i.i.d. 와 같음
+    for resampling in BLOCK_METHODS:
+        np.testing.assert_array_equal(mc.resample_indices(np.random.default_rng(3), num_returns, 100, 300,
+                                                          resampling, block_length=1), expected)
+
+def test_block_schemes_have_no_exact_distributions():
+    returns = np.round(np.random.default_rng(4).normal(0.5, 8, 200), 1)
+    assert mc.simulate(returns, 500, 4000, seed=5).exact is not None
+    for resampling in BLOCK_METHODS:
+        result = mc.simulate(returns, 500, 4000, seed=5, resampling=resampling)
+        assert result.exact is None
+        assert result.resampling == resampling
+        result.summary()  # 모든 행을 표본에서 계산
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import yestrader_montecarlo as mc
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(mc, 'RETURNS_CACHE_DIR', str(tmp_path / 'returns_cache'))
+    return tmp_path / 'returns_cache'
+
+# Function to write a workbook with one sheet per (name, daily PnL) pair
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, pnl in sheets.items():
+            data = pd.DataFrame({'date': pd.bdate_range('2024-01-01', periods=len(pnl)), 'pnl': pnl})
+            data.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+class CountingParser:
+    def __init__(self):
+        self.sheets = []
+
+    def __call__(self, data):
+        self.sheets.append(len(data))
+        return {'returns': mc.extract_returns(data)}
+
+@pytest.fixture
+def workbook(tmp_path):
+    return write_workbook(tmp_path / 'returns.xlsx', {'A': [1.0, -2.0, 3.5], 'B': [0.5, 0.25, -1.0, 2.0]})
+
+def test_second_load_skips_parsing(workbook, cache_dir, monkeypatch):
+    parser = CountingParser()
+    first = mc.load_cached_sheets(workbook, ['A', 'B'], 'returns', parser)
+    assert parser.sheets == [3, 4]
+    assert len(os.listdir(cache_dir)) == 2
+
+    # 캐시에 있으면 통합 문서를 열지도 않음
+    monkeypatch.setattr(pd, 'ExcelFile', lambda *args, **kwargs: pytest.fail("the workbook was opened"))
+    second = mc.load_cached_sheets(workbook, ['A', 'B'], 'returns', parser)
+    assert parser.sheets == [3, 4]
+    for arrays, cached in zip(first, second):
+        np.testing.assert_array_equal(cached['returns'], arrays['returns'])
+        assert str(cached['sheet_name']) == str(arrays['sheet_name'])
+
+def test_rewritten_workbook_invalidates_the_entry(workbook):
+    assert mc.load_returns(workbook, 'A')[0].tolist() == [1.0, -2.0, 3.5]
+    stat = os.stat(workbook)
+    write_workbook(workbook, {'A': [1.0, -2.0, 4.5], 'B': [0.5, 0.25, -1.0, 2.0]})
+    # 수정 시각을 되돌려도 내용의 해시가 달라지므로 다시 읽음
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    parser = CountingParser()
+    (arrays,) = mc.load_cached_sheets(workbook, ['A'], 'returns', parser)
+    assert parser.sheets == [3]
+    assert arrays['returns'].tolist() == [1.0, -2.0, 4.5]
+    assert mc.load_returns(workbook, 'A')[0].tolist() == [1.0, -2.0, 4.5]
+
+@pytest.mark.parametrize('sheet_name, expected_name, expected_returns', [
+    ("", 'A', [1.0, -2.0, 3.5]),
+    (None, 'A', [1.0, -2.0, 3.5]),
+    ('A', 'A', [1.0, -2.0, 3.5]),
+    ('B', 'B', [0.5, 0.25, -1.0, 2.0]),
+])
+def test_sheet_names_resolve(workbook, sheet_name, expected_name, expected_returns):
+    for _ in range(2):  # 처음 (파싱) 과 두 번째 (캐시) 모두
+        returns, resolved_name = mc.load_returns(workbook, sheet_name)
+        assert resolved_name == expected_name
+        assert returns.tolist() == expected_returns
+
+def test_kinds_are_cached_separately(workbook):
+    returns, _ = mc.load_returns(workbook, 'B')
+    table = mc.load_portfolio_returns([(workbook, 'B')])
+    assert list(table.columns) == ['B']
+    np.testing.assert_array_equal(table['B'].to_numpy(), returns)
+    assert mc.load_returns(workbook, 'B')[0].tolist() == returns.tolist()
+
+def test_without_cache_nothing_is_written(workbook, cache_dir):
+    parser = CountingParser()
+    for _ in range(2):
+        mc.load_cached_sheets(workbook, ['A'], 'returns', parser, use_cache=False)
+    assert parser.sheets == [3, 3]
+    assert not cache_dir.exists()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import montecarlo_server
+import yestrader_montecarlo as mc
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(mc, 'RETURNS_CACHE_DIR', str(tmp_path / 'returns_cache'))
+    path = tmp_path / 'returns.xlsx'
+    returns = np.round(np.random.default_rng(0).normal(0.4, 8, 120), 1)
+    data = pd.DataFrame({'date': pd.bdate_range('2024-01-01', periods=120), 'pnl': returns})
+    with pd.ExcelWriter(path) as writer:
+        data.to_excel(writer, sheet_name='A', index=False)
+    return str(path)
+
+@pytest.fixture
+def server_url(tmp_path):
+    server = montecarlo_server.JobServer(num_workers=2, store_dir=str(tmp_path / 'runs'))
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    task = loop.create_task(server.serve('127.0.0.1', 0, ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield "http://{}:{}".format(*server.address)
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    loop.close()
+
+# Function to send a raw request body and return (HTTP status, decoded JSON answer)
+def post(url, body):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8'))
+
+def job_body(file_path, **fields):
+    return json.dumps(dict({'file': file_path, 'simulations': 300, 'initial_value': 4000, 'seed': 7}, **fields)).encode()
+
+def test_concurrent_duplicates_share_one_job(server_url, workbook):
+    with ThreadPoolExecutor(4) as executor:
+        answers = list(executor.map(lambda _: post(server_url + '/jobs?wait=1', job_body(workbook)), range(4)))
+    assert {status for status, _ in answers} == {200}
+    assert len({job['id'] for _, job in answers}) == 1
+    assert sum(not job['existing'] for _, job in answers) == 1
+    job = mc.server_request(f"{server_url}/jobs/{answers[0][1]['id']}")
+    assert job['status'] == 'done' and job['submissions'] == 4
+
+    result = mc.open_run(job['run_dir'])
+    expected = mc.simulate(result.returns, 300, 4000, seed=7, capital_sweep=True)
+    np.testing.assert_array_equal(result.metrics['final_pnl'], expected.metrics['final_pnl'])
+
+def test_repeat_is_answered_from_cache(server_url, workbook):
+    _, first = post(server_url + '/jobs?wait=1', job_body(workbook, sheet='A'))
+    status, repeat = post(server_url + '/jobs', job_body(workbook, sheet='A'))
+    assert status == 200  # 이미 끝난 작업이므로 기다리지 않아도 완료 상태
+    assert repeat['existing'] and repeat['id'] == first['id'] and repeat['run_dir'] == first['run_dir']
+
+    # 입력이 다르면 (다른 시드, 시드 없음) 새 작업
+    _, other = post(server_url + '/jobs?wait=1', job_body(workbook, sheet='A', seed=8))
+    _, unseeded = post(server_url + '/jobs?wait=1', job_body(workbook, sheet='A', seed=None))
+    assert len({first['id'], other['id'], unseeded['id']}) == 3
+    _, unseeded_again = post(server_url + '/jobs?wait=1', job_body(workbook, sheet='A', seed=None))
+    assert not unseeded_again['existing']
+
+@pytest.mark.parametrize('body', [b'{"file": ', b'[]', b'{"sheet": "A"}'])
+def test_bad_requests_are_rejected(server_url, body):
+    status, answer = post(server_url + '/jobs', body)
+    assert status == 400 and answer['error']
+
+def test_bad_fields_are_rejected(server_url, workbook):
+    for fields in ({'simulations': 'many'}, {'simulations': 0}, {'resampling': 'weekly'}):
+        status, answer = post(server_url + '/jobs', job_body(workbook, **fields))
+        assert status == 400 and answer['error'], fields
+
+def test_missing_file_is_not_found(server_url, tmp_path):
+    status, answer = post(server_url + '/jobs', job_body(str(tmp_path / 'missing.xlsx')))
+    assert status == 404 and answer['error']
+
+@pytest.mark.parametrize('sheet', ['없는 시트', None])
+def test_unreadable_input_gives_an_error_job(server_url, workbook, tmp_path, sheet):
+    file_path = workbook
+    if sheet is None:  # 엑셀이 아닌 파일
+        file_path = str(tmp_path / 'not_excel.xlsx')
+        with open(file_path, 'w') as f:
+            f.write("not a workbook")
+    status, job = post(server_url + '/jobs?wait=1', job_body(file_path, sheet=sheet))
+    assert status == 200 and job['status'] == 'error' and job['error']
+
+    # 실패한 작업은 캐시되지 않고 다시 제출하면 새로 실행
+    _, retry = post(server_url + '/jobs?wait=1', job_body(file_path, sheet=sheet))
+    assert retry['id'] != job['id'] and not retry['existing']
+
+def test_unknown_routes(server_url):
+    status, _ = post(server_url + '/nothing', b'{}')
+    assert status == 404
+    with pytest.raises(ValueError):
+        mc.server_request(server_url + '/jobs/12345')
+    assert mc.server_request(server_url + '/health')['status'] == 'ok'
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+RETURNS = np.round(np.random.default_rng(0).normal(0.4, 8, 200), 1)
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+@pytest.fixture(scope='module')
+def cumulative_pnl():
+    rng = np.random.default_rng(1)
+    return np.cumsum(RETURNS[rng.integers(0, len(RETURNS), size=(20000, len(RETURNS)))], axis=1)
+
+def test_quantiles_match_percentile(cumulative_pnl):
+    sketch = mc.DailyQuantileSketch.from_returns(RETURNS)
+    sketch.add(cumulative_pnl)
+    assert sketch.total == len(cumulative_pnl)
+    assert sketch.counts.sum() == cumulative_pnl.size
+
+    expected = np.percentile(cumulative_pnl, PERCENTILES, axis=0)
+    # 구간 폭은 그날 표준편차의 약 16 / 512 = 3% 이고, 오차는 구간 하나를 넘지 않음
+    assert np.all(sketch.bin_width <= 0.05 * cumulative_pnl.std(axis=0))
+    assert np.all(np.abs(sketch.quantiles(PERCENTILES) - expected) <= sketch.bin_width)
+
+    days = np.array([0, 17, 199])
+    np.testing.assert_array_equal(sketch.quantiles(PERCENTILES, days), sketch.quantiles(PERCENTILES)[:, days])
+
+def test_merge_of_halves_equals_one_add(cumulative_pnl):
+    whole = mc.DailyQuantileSketch.from_returns(RETURNS)
+    whole.add(cumulative_pnl)
+    first, second = mc.DailyQuantileSketch.from_returns(RETURNS), mc.DailyQuantileSketch.from_returns(RETURNS)
+    first.add(cumulative_pnl[:7000])
+    second.add(cumulative_pnl[7000:])
+    merged = first.merge(second)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert merged.total == whole.total
+    np.testing.assert_array_equal(merged.quantiles(PERCENTILES), whole.quantiles(PERCENTILES))
+
+def test_values_outside_the_range_are_reported_at_the_edges():
+    sketch = mc.DailyQuantileSketch(np.array([0.0, 10.0]), np.array([1.0, 20.0]), num_bins=10)
+    sketch.add(np.array([[-5.0, 10.0], [-3.0, 30.0], [0.5, 50.0], [2.0, 15.05]]))
+    # [아래쪽 넘침, 구간 10개, 위쪽 넘침]
+    np.testing.assert_array_equal(sketch.counts[0], [2, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(sketch.counts[1], [0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 2])
+    low, high = sketch.quantiles([0, 100])
+    np.testing.assert_array_equal(high, [1.0, 20.0])  # 넘침 구간의 값은 그쪽 경계로 보고
+    assert low[0] == 0.0
+    assert 10.0 <= low[1] <= 11.0  # 구간 안의 값은 그 구간 안에서 보간
+
+@pytest.mark.parametrize('value', [0.0, 2.5, -1.0])
+def test_constant_series(value):
+    returns = np.full(30, value)
+    sketch = mc.DailyQuantileSketch.from_returns(returns)
+    assert np.all(sketch.upper > sketch.lower)
+    assert np.all(np.isfinite(sketch.bin_width)) and np.all(sketch.bin_width > 0)
+    sketch.add(np.cumsum(np.tile(returns, (50, 1)), axis=1))
+    assert sketch.counts[:, 1:-1].sum() == 50 * 30  # 모두 구간 안에 들어감
+    np.testing.assert_allclose(sketch.quantiles(PERCENTILES), np.tile(np.arange(1, 31) * value, (len(PERCENTILES), 1)),
+                               atol=1e-6)
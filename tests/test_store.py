@@ -0,0 +1,63 @@
+import os
+
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use('Agg')
+
+import yestrader_montecarlo as mc
+
+@pytest.fixture
+def portfolio_runs(tmp_path):
+    table = np.round(np.random.default_rng(0).normal(0.5, 8, (300, 2)), 1)
+    result = mc.simulate_portfolio(table, 2000, 4000, seed=1, strategy_names=['A', 'B'], capital_sweep=True)
+    for strategy_result in result.values():
+        mc.save_run(strategy_result, store_dir=str(tmp_path))
+    return {run['sheet_name']: run for run in mc.list_runs(str(tmp_path))}
+
+def test_strategy_runs_are_stored_without_bands(portfolio_runs):
+    assert portfolio_runs[mc.PORTFOLIO_NAME]['sketch_total'] == 2000
+    assert portfolio_runs['A']['sketch_total'] is None
+    assert mc.open_run(portfolio_runs['A']['run_dir']).band_sketch is None
+
+@pytest.mark.parametrize('name, comparison_name', [('A', None), ('A', 'B'), ('A', mc.PORTFOLIO_NAME),
+                                                   (mc.PORTFOLIO_NAME, 'A')])
+def test_plot_skips_missing_bands(portfolio_runs, name, comparison_name):
+    result = mc.open_run(portfolio_runs[name]['run_dir'])
+    comparison = mc.open_run(portfolio_runs[comparison_name]['run_dir']) if comparison_name else None
+    plot = mc.SimulationPlot()
+    plot.update(result, max_points=400, comparison=comparison)
+    plot.figure.canvas.draw()
+
+    assert plot.median_line.get_visible() == (result.band_sketch is not None)
+    assert plot.comparison_line.get_visible() == (comparison is not None and comparison.band_sketch is not None)
+    assert np.all(np.isfinite(plot.ax.get_ylim()))
+
+def test_prune_runs_keeps_the_newest_within_budget(tmp_path, monkeypatch):
+    result = mc.simulate(np.round(np.random.default_rng(0).normal(0.5, 8, 100), 1), 500, 4000, seed=1)
+    run_dirs = []
+    for i in range(4):
+        monkeypatch.setattr(mc.time, 'strftime', lambda _, i=i: f"20260101-00000{i}")  # 생성 순서대로 정렬되도록
+        run_dirs.append(mc.save_run(result, store_dir=str(tmp_path)))
+    size = mc.run_size(run_dirs[0])
+
+    assert mc.prune_runs(str(tmp_path), max_bytes=4 * size) == []
+    assert mc.prune_runs(str(tmp_path), max_bytes=2 * size + 1) == run_dirs[1::-1]
+    assert [run['run_dir'] for run in mc.list_runs(str(tmp_path))] == run_dirs[:1:-1]
+    # keep 에 있는 실행은 예산을 넘어도 지우지 않음
+    assert mc.prune_runs(str(tmp_path), max_bytes=0, keep=[run_dirs[2]]) == [run_dirs[3]]
+    assert [run['run_dir'] for run in mc.list_runs(str(tmp_path))] == [run_dirs[2]]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(run_dirs[2])]
+
+def test_discard_incomplete_run(tmp_path):
+    incomplete = mc.create_run_dir('A', str(tmp_path))
+    np.save(os.path.join(incomplete, 'paths.npy'), np.zeros((3, 3)))
+    mc.discard_incomplete_run(incomplete)
+    assert not os.path.exists(incomplete)
+
+    result = mc.simulate(np.round(np.random.default_rng(0).normal(0.5, 8, 100), 1), 50, 4000, seed=1)
+    complete = mc.save_run(result, store_dir=str(tmp_path))
+    mc.discard_incomplete_run(complete)
+    mc.discard_incomplete_run(None)
+    assert mc.open_run(complete).num_simulations == 50
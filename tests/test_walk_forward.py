@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+WINDOW_DAYS = 60
+MAX_POINTS = 2**14  # 창이 많아도 빠르도록 작은 격자
+
+def tick_returns():
+    rng = np.random.default_rng(0)
+    returns = np.round(rng.normal(0.4, 8, 300), 1)
+    returns[rng.random(300) < 0.15] = 0
+    return returns
+
+def tickless_returns():
+    return np.random.default_rng(1).normal(0.4, 8, 300)
+
+@pytest.mark.parametrize('returns_factory', [tick_returns, tickless_returns])
+# 겹치는 간격 (1, 25) 과 창 이상인 간격 (60, 100: 매번 새로 셈)
+@pytest.mark.parametrize('step_days', [1, 25, 60, 100])
+def test_incremental_exact_matches_recompute(returns_factory, step_days):
+    returns = returns_factory()
+    starts = list(range(0, len(returns) - WINDOW_DAYS + 1, step_days))
+    low, step, num_bins = mc.exact_grid(returns, WINDOW_DAYS, MAX_POINTS)
+
+    windows = list(mc.walk_forward_exact(returns, starts, WINDOW_DAYS, MAX_POINTS))
+    assert len(windows) == len(starts)
+    for start, exact in zip(starts, windows):
+        window_returns = returns[start:start + WINDOW_DAYS]
+        # Reference: the window's grid weights and win/non-zero counts recounted from scratch on the same grid
+        final_pnl = mc.grid_sum_distribution(mc.grid_weights(window_returns, low, step, num_bins), WINDOW_DAYS, low, step)
+        np.testing.assert_array_equal(exact['final_pnl'].values, final_pnl.values)
+        np.testing.assert_allclose(exact['final_pnl'].probabilities, final_pnl.probabilities, rtol=0, atol=1e-12)
+        assert exact['final_pnl'].mean() == pytest.approx(window_returns.sum(), rel=1e-9, abs=1e-9)
+
+        win_rate = mc.exact_win_rate_distribution(window_returns)
+        np.testing.assert_array_equal(exact['win_probability'].values, win_rate.values)
+        np.testing.assert_array_equal(exact['win_probability'].probabilities, win_rate.probabilities)
+
+def test_tick_grid_matches_exact_final_pnl_distribution():
+    # 틱 격자에서는 전체 시리즈 격자와 창 자체의 격자가 같은 점들이므로 분위가 같음
+    returns = tick_returns()
+    percentiles = [1, 5, 25, 50, 75, 95, 99]
+    for start, exact in zip([0, 30, 240], mc.walk_forward_exact(returns, [0, 30, 240], WINDOW_DAYS)):
+        expected = mc.exact_final_pnl_distribution(returns[start:start + WINDOW_DAYS])
+        np.testing.assert_allclose(exact['final_pnl'].quantiles(percentiles), expected.quantiles(percentiles),
+                                   rtol=0, atol=1e-9)
+
+def test_table_uses_the_window_distributions():
+    returns = tick_returns()
+    table = mc.walk_forward(returns, WINDOW_DAYS, 80, 200, 4000, seed=0, columns=[('cagr', 50)])
+    assert list(table['시작']) == [0, 80, 160, 240]
+    for row, exact in zip(table.to_dict('records'), mc.walk_forward_exact(returns, table['시작'], WINDOW_DAYS)):
+        (median_pnl,) = exact['final_pnl'].quantiles([50])
+        expected = mc.compute_cagr(np.array([4000 + median_pnl]), 4000, WINDOW_DAYS / 252)[0]
+        assert row["CAGR 50% 분위"] == pytest.approx(expected, rel=1e-9)
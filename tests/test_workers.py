@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import yestrader_montecarlo as mc
+
+RETURNS = np.round(np.random.default_rng(0).normal(0.4, 8, 200), 1)
+
+# Function to assert that two results have identical metric arrays, band sketches and sample paths
+def assert_identical(result, expected):
+    assert result.metrics.keys() == expected.metrics.keys()
+    for key in expected.metrics:
+        np.testing.assert_array_equal(result.metrics[key], expected.metrics[key], err_msg=key)
+    np.testing.assert_array_equal(result.band_sketch.counts, expected.band_sketch.counts)
+    np.testing.assert_array_equal(result.sample_paths, expected.sample_paths)
+
+@pytest.mark.parametrize('resampling', ['iid', 'stationary'])
+def test_same_seed_and_workers_are_bit_identical(resampling):
+    # 작업자마다 청크가 여러 개가 되도록 청크를 작게 잡음
+    runs = [mc.simulate(RETURNS, 3001, 4000, seed=11, num_workers=2, chunk_size=400, capital_sweep=True,
+                        resampling=resampling) for _ in range(2)]
+    assert_identical(runs[1], runs[0])
+    assert len(runs[0].metrics['final_pnl']) == 3001
+    assert runs[0].band_sketch.total == 3001
+
+def test_workers_are_merged_in_worker_order():
+    result = mc.simulate(RETURNS, 3001, 4000, seed=11, num_workers=2, chunk_size=400, capital_sweep=True)
+    # Reference: each worker's share simulated in one process with its spawned generator, concatenated in order
+    shares = [len(share) for share in np.array_split(np.arange(3001), 2)]
+    worker_results = [mc.simulate_chunks(RETURNS, share, 4000, 400, 20, seed_sequence, capital_sweep=True)
+                      for share, seed_sequence in zip(shares, np.random.SeedSequence(11).spawn(2))]
+    for key in result.metrics:
+        np.testing.assert_array_equal(result.metrics[key],
+                                      np.concatenate([metrics[key] for metrics, _, _ in worker_results]), err_msg=key)
+    sketch = worker_results[0][1].merge(worker_results[1][1])
+    np.testing.assert_array_equal(result.band_sketch.counts, sketch.counts)
+    np.testing.assert_array_equal(result.sample_paths, np.vstack([paths for _, _, paths in worker_results])[:20])
@@ -1,366 +1,2086 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-from tkinter import ttk
 import math
-import seaborn as sns
 import os
 import sys
-
-# Function to set matplotlib font to support Korean characters
-def set_korean_font():
-    plt.rcParams['font.family'] = 'Malgun Gothic'  # 'Malgun Gothic' is commonly used in Windows for Korean
-    plt.rcParams['axes.unicode_minus'] = False  # Ensure minus sign is shown correctly
+import argparse
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from contextlib import contextmanager, nullcontext
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_EXCEPTION, wait
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+# tkinter, matplotlib and seaborn are only imported when the GUI starts (see the bottom of this file),
+# so the simulation functions and the batch CLI work on headless machines.
+
+# Function to calculate the longest run of True values in every row of a boolean matrix
+def longest_true_runs(mask):
+    num_paths, num_days = mask.shape
+    if num_days == 0:
+        return np.zeros(num_paths, dtype=int)
+
+    # 각 시점에서 마지막으로 False 였던 날의 인덱스 -> 현재까지 이어진 True 연속 일수
+    days = np.arange(num_days, dtype=np.int32)
+    last_false_day = np.where(mask, np.int32(-1), days)
+    np.maximum.accumulate(last_false_day, axis=1, out=last_false_day)
+    np.subtract(days, last_false_day, out=last_false_day)
+    return np.max(last_false_day, axis=1)
+
+# Function to calculate the maximum underwater period of every row of a cumulative PnL matrix
+def max_underwater_periods(cumulative_returns, running_max=None):
+    """ Longest run of consecutive underwater days for each row (path) of a 2D cumulative PnL matrix.
+    Pass running_max if it has already been computed to avoid a second accumulate over the matrix. """
+    cumulative_returns = np.atleast_2d(np.asarray(cumulative_returns, dtype=float))
+    if running_max is None:
+        running_max = np.maximum.accumulate(cumulative_returns, axis=1)
+    underwater_periods = (running_max - cumulative_returns) > 0  # Boolean matrix indicating underwater periods
+    return longest_true_runs(underwater_periods)
 
 # Function to calculate the maximum underwater period
 def max_underwater_period(cumulative_returns):
-    running_max = np.maximum.accumulate(cumulative_returns)
-    underwater_periods = (running_max - cumulative_returns) > 0  # Boolean array indicating underwater periods
-    underwater_durations = []
-    current_duration = 0
-
-    for period in underwater_periods:
-        if period:
-            current_duration += 1
+    return int(max_underwater_periods(np.asarray(cumulative_returns, dtype=float)[np.newaxis, :])[0])
+
+# Function to calculate the metrics that only depend on the daily returns of every path (one path per row)
+def compute_return_metrics(simulation_daily_returns):
+    num_paths = simulation_daily_returns.shape[0]
+
+    # 승률 계산
+    positive_mask = simulation_daily_returns > 0
+    negative_mask = simulation_daily_returns < 0
+    profitable_days = np.count_nonzero(positive_mask, axis=1)
+    non_zero_days = np.count_nonzero(simulation_daily_returns, axis=1)
+    win_probability = np.divide(profitable_days, non_zero_days,
+                                out=np.zeros(num_paths), where=non_zero_days != 0)
+
+    # 손익비 계산 (양수/음수 수익만 대상으로 하는 마스크 평균)
+    losing_days = np.count_nonzero(negative_mask, axis=1)
+    average_profit = np.divide(np.sum(simulation_daily_returns, axis=1, where=positive_mask), profitable_days,
+                               out=np.zeros(num_paths), where=profitable_days > 0)
+    average_loss = np.divide(np.sum(simulation_daily_returns, axis=1, where=negative_mask), losing_days,
+                             out=np.zeros(num_paths), where=losing_days > 0)
+    profit_loss_ratio = np.divide(average_profit, np.abs(average_loss),
+                                  out=np.full(num_paths, np.inf), where=average_loss != 0)
+
+    # 샤프 비율 계산
+    mean_return = np.mean(simulation_daily_returns, axis=1)
+    std_dev_return = np.std(simulation_daily_returns, axis=1)
+    sharpe_ratio = np.divide(mean_return, std_dev_return,
+                             out=np.full(num_paths, np.inf), where=std_dev_return != 0) * np.sqrt(252 / 12)
+
+    return {
+        'win_probability': win_probability,
+        'profit_loss_ratio': profit_loss_ratio,
+        'sharpe_ratio': sharpe_ratio,
+    }
+
+# Function to calculate the CAGR of every path from its final value
+def compute_cagr(final_value, initial_value, years):
+    cagr = np.zeros(len(final_value))
+    growing = final_value > initial_value
+    cagr[growing] = (final_value[growing] / initial_value)**(1/years) - 1
+    return cagr
+
+# Function to calculate the metrics that depend on the cumulative PnL of every path (one path per row)
+def compute_path_metrics(cumulative_pnl, initial_value, years, in_place=False, drawdown_frontier=False):
+    """ With in_place=True the cumulative_pnl matrix is reused as working memory and overwritten.
+    With drawdown_frontier=True the drawdown_frontier_* arrays are added: for every path the (peak PnL,
+    drawdown) pairs that deepened its drawdown, flattened path after path with their count per path,
+    so that capital-dependent metrics can be re-evaluated later without the path matrix
+    (see SimulationResult.with_capital). """
+    final_pnl = cumulative_pnl[:, -1].copy()
+    if in_place:
+        cumulative_returns = np.add(cumulative_pnl, initial_value, out=cumulative_pnl)
+    else:
+        cumulative_returns = initial_value + cumulative_pnl
+    final_value = cumulative_returns[:, -1]
+
+    # CAGR 계산
+    cagr = compute_cagr(final_value, initial_value, years)
+
+    # MDD 계산 (낙폭 금액 행렬을 그대로 낙폭 비율 계산에 재사용)
+    running_max = np.maximum.accumulate(cumulative_returns, axis=1)
+    drawdown = np.subtract(running_max, cumulative_returns)
+    max_drawdown_amount = np.max(drawdown, axis=1)
+
+    # 최대 underwater 기간 계산
+    underwater = drawdown > 0
+    max_underwater_days = longest_true_runs(underwater)
+
+    frontier = {}
+    if drawdown_frontier:
+        # 자본 스윕용: 낙폭이 그때까지의 최대 낙폭을 갱신한 (고점 PnL, 낙폭) 쌍, 같은 고점에서는 마지막 것만 남김
+        underwater[:, 1:] &= drawdown[:, 1:] > np.maximum.accumulate(drawdown, axis=1)[:, :-1]
+        rows, days = np.nonzero(underwater)
+        frontier_peak = running_max[rows, days]
+        last_of_peak = np.ones(len(rows), dtype=bool)
+        last_of_peak[:-1] = (rows[1:] != rows[:-1]) | (frontier_peak[1:] != frontier_peak[:-1])
+        frontier = {
+            'drawdown_frontier_count': np.bincount(rows[last_of_peak], minlength=len(final_value)),
+            'drawdown_frontier_peak': frontier_peak[last_of_peak] - initial_value,
+            'drawdown_frontier_depth': drawdown[rows[last_of_peak], days[last_of_peak]],
+        }
+
+    np.divide(drawdown, running_max, out=drawdown, where=running_max != 0)
+    drawdown[running_max == 0] = 0  # Ensure no division by zero issues
+    max_drawdown = np.max(drawdown, axis=1)
+
+    # 보상비율 계산
+    reward_ratio = np.divide(final_value, np.abs(max_drawdown_amount),
+                             out=np.full(len(final_value), np.inf), where=max_drawdown != 0)
+
+    return {
+        'final_pnl': final_pnl,
+        'final_value': final_value.copy() if in_place else final_value,
+        'cagr': cagr,
+        'max_drawdown': max_drawdown,
+        'max_underwater_period': max_underwater_days,
+        'reward_ratio': reward_ratio,
+        **frontier,
+    }
+
+# Function to calculate per-simulation metrics for a whole matrix of daily returns at once
+def compute_simulation_metrics(simulation_daily_returns, initial_value, years, cumulative_pnl=None):
+    """ Compute the metrics of every simulated path (one path per row) in a single pass along axis=1.
+    Gives the same numbers as evaluating each path on its own, including the inf/zero edge cases.
+    Pass cumulative_pnl if the cumulative sum of the returns has already been computed. """
+    simulation_daily_returns = np.asarray(simulation_daily_returns)
+    if not np.issubdtype(simulation_daily_returns.dtype, np.floating):
+        simulation_daily_returns = simulation_daily_returns.astype(float)
+    if cumulative_pnl is None:
+        cumulative_pnl = np.cumsum(simulation_daily_returns, axis=1)
+
+    metrics = compute_path_metrics(cumulative_pnl, initial_value, years)
+    metrics.update(compute_return_metrics(simulation_daily_returns))
+    return metrics
+
+# Resampling schemes of the day indices: i.i.d. days, fixed-length blocks, and geometric-length blocks
+RESAMPLING_METHODS = {'iid': "일별 (i.i.d.)", 'block': "고정 블록", 'stationary': "정상 블록 (기하 길이)"}
+DEFAULT_BLOCK_LENGTH = 20  # Days per block (the mean block length for 'stationary'), about one trading month
+
+# Function to wrap day indices in [0, 2 * num_returns) back into [0, num_returns), in place
+def wrap_indices(indices, num_returns):
+    # 부호 없는 정수로 보면 index - n 이 음수일 때 아주 큰 값이 되므로, 최솟값이 곧 순환한 인덱스
+    unsigned = indices.view(indices.dtype.str.replace('i', 'u'))
+    np.minimum(unsigned, (indices - num_returns).view(unsigned.dtype), out=unsigned)
+    return indices
+
+# Function to draw a (num_paths, num_days) matrix of random day indices into a series of num_returns days
+def resample_indices(rng, num_returns, num_paths, num_days, resampling='iid', block_length=DEFAULT_BLOCK_LENGTH):
+    """ 'iid' draws every day independently. 'block' (circular block bootstrap) copies runs of
+    block_length consecutive days from random starts, wrapping around the end of the series, and
+    'stationary' (Politis-Romano stationary bootstrap) starts a new run at a random day with
+    probability 1 / block_length on every day, so the run lengths are geometric. Both block schemes
+    keep the volatility clustering and losing streaks within a block. Every scheme is generated for
+    all paths at once with whole-matrix operations. Uses the smallest integer dtype that can address
+    every return (int16/int32). """
+    if resampling not in RESAMPLING_METHODS:
+        raise ValueError(f"Unknown resampling method {resampling!r}, expected one of {list(RESAMPLING_METHODS)}.")
+    if resampling == 'iid':
+        index_dtype = np.int16 if num_returns <= np.iinfo(np.int16).max + 1 else np.int32
+        return rng.integers(0, num_returns, size=(num_paths, num_days), dtype=index_dtype)
+
+    block_length = min(max(int(round(block_length)), 1), num_returns)
+    if block_length == 1:  # Blocks of one day are i.i.d. days
+        return resample_indices(rng, num_returns, num_paths, num_days)
+    if resampling == 'block':
+        # 블록 시작점만 뽑고 (일수 / 블록 길이 개) 블록 안의 날은 시작점에 0, 1, 2, ... 를 더해서 만듦
+        index_dtype = np.int16 if 2 * num_returns <= np.iinfo(np.int16).max + 1 else np.int32
+        num_blocks = -(-num_days // block_length)
+        starts = rng.integers(0, num_returns, size=(num_paths, num_blocks, 1), dtype=index_dtype)
+        indices = (starts + np.arange(block_length, dtype=index_dtype)).reshape(num_paths, -1)[:, :num_days]
+        return wrap_indices(indices, num_returns)
+
+    # 블록 길이를 기하분포로 (경로당 평균 일수 / 블록 길이 개 정도) 뽑아서 일수를 넘는 부분은 잘라내고,
+    # 블록마다 (시작점 - 블록이 시작하는 날) 을 블록 길이만큼 반복한 뒤 날짜를 더하면 인덱스가 됨
+    index_dtype = np.int16 if num_returns + num_days <= np.iinfo(np.int16).max + 1 else np.int32
+    probability = 1 / block_length
+    expected_blocks = (num_days - 1) * probability
+    num_blocks = int(np.ceil(expected_blocks + 8 * np.sqrt(expected_blocks) + 8))
+
+    def draw_lengths(count):
+        # 역변환으로 기하분포 생성 (rng.geometric 보다 빠름)
+        return (np.log1p(-rng.random((num_paths, count))) / np.log1p(-probability)).astype(np.int64) + 1
+
+    lengths = draw_lengths(num_blocks)
+    block_ends = np.cumsum(lengths, axis=1)
+    while block_ends[:, -1].min() < num_days:  # Practically never: some path needs more blocks
+        lengths = np.hstack([lengths, draw_lengths(num_blocks)])
+        block_ends = np.cumsum(lengths, axis=1)
+    block_days = block_ends - lengths
+    np.clip(num_days - block_days, 0, lengths, out=lengths)
+
+    offsets = rng.integers(0, num_returns, size=lengths.shape, dtype=index_dtype) - block_days.astype(index_dtype)
+    indices = np.repeat(offsets.ravel(), lengths.ravel()).reshape(num_paths, num_days)
+    indices += np.arange(num_days, dtype=index_dtype)
+    if num_days > num_returns:  # Runs longer than the series can wrap more than once
+        return np.remainder(indices, num_returns, out=indices)
+    return wrap_indices(indices, num_returns)
+
+# Function to draw a batch of resampled paths by gathering the returns at random day indices
+def resample_paths(rng, returns, num_paths, num_days=None, dtype=np.float64, resampling='iid',
+                   block_length=DEFAULT_BLOCK_LENGTH):
+    """ Draws one (num_paths, num_days) index matrix (see resample_indices), then gathers the returns
+    in one step as dtype (float64 or float32). """
+    num_days = len(returns) if num_days is None else num_days
+    indices = resample_indices(rng, len(returns), num_paths, num_days, resampling, block_length)
+    return np.asarray(returns, dtype=dtype)[indices]
+
+# Percentiles reported in the results table and drawn as bands in the plot
+RESULT_PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Memory budget for one chunk of simulated paths in streaming mode
+DEFAULT_CHUNK_MEMORY_BYTES = 256 * 1024 * 1024
+
+# Mergeable per-day quantile sketch used for the plot bands in streaming mode
+class DailyQuantileSketch:
+    """ Fixed-bin histogram of the cumulative PnL of every day.
+    Counts from separate chunks (or workers) can be added together with merge(), and quantiles are
+    read back by linear interpolation inside the bin that holds the requested rank. Values outside
+    [lower, upper] of a day are counted in an underflow/overflow bin and reported at that edge. """
+
+    def __init__(self, lower, upper, num_bins=512):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.num_bins = num_bins
+        self.bin_width = (self.upper - self.lower) / num_bins
+        self.counts = np.zeros((len(self.lower), num_bins + 2), dtype=np.int64)  # [underflow, bins..., overflow]
+        self.total = 0
+
+    @classmethod
+    def from_returns(cls, returns, num_bins=512, width_in_std=8.0):
+        """ Size the bins of day n around n*mean +/- width_in_std*sqrt(n)*std of the daily returns,
+        clipped to the reachable range [n*min, n*max]. """
+        returns = np.asarray(returns, dtype=float)
+        n = np.arange(1, len(returns) + 1)
+        center = n * np.mean(returns)
+        half_width = width_in_std * np.sqrt(n) * np.std(returns)
+        lower = np.maximum(center - half_width, n * np.min(returns))
+        upper = np.minimum(center + half_width, n * np.max(returns))
+        # 수익이 일정한 경우 등 폭이 0인 구간은 아주 작은 폭으로 대체
+        degenerate = upper <= lower
+        upper[degenerate] = lower[degenerate] + np.maximum(np.abs(lower[degenerate]), 1.0) * 1e-9
+        return cls(lower, upper, num_bins)
+
+    @classmethod
+    def from_arrays(cls, lower, upper, counts, total):
+        """ Rebuild a sketch around existing counts, without copying them (e.g. from a stored run). """
+        sketch = cls.__new__(cls)
+        sketch.lower, sketch.upper, sketch.counts, sketch.total = lower, upper, counts, total
+        sketch.num_bins = counts.shape[1] - 2
+        sketch.bin_width = (upper - lower) / sketch.num_bins
+        return sketch
+
+    def add(self, cumulative_pnl):
+        """ Add a chunk of paths (one path per row, one day per column). """
+        cumulative_pnl = np.atleast_2d(cumulative_pnl)
+        dtype = cumulative_pnl.dtype
+        bins = np.subtract(cumulative_pnl, self.lower.astype(dtype))
+        bins /= self.bin_width.astype(dtype)
+        np.floor(bins, out=bins)
+        np.clip(bins, -1, self.num_bins, out=bins)
+        flat_index = bins.astype(np.int64)
+        flat_index += np.arange(len(self.lower)) * (self.num_bins + 2) + 1
+        self.counts += np.bincount(flat_index.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.total += cumulative_pnl.shape[0]
+
+    def merge(self, other):
+        """ Add the counts of another sketch built with the same bins. """
+        self.counts += other.counts
+        self.total += other.total
+        return self
+
+    def quantiles(self, percentiles, days=None):
+        """ Per-day values at the given percentiles, shape (len(percentiles), num_days).
+        Pass days (an index array) to only evaluate those days, e.g. the decimated days of a plot. """
+        days = np.arange(len(self.lower)) if days is None else np.asarray(days)
+        counts = self.counts[days]
+        cumulative_counts = np.cumsum(counts, axis=1)
+        rows = np.arange(len(days))
+        lower = self.lower[days]
+        upper = self.upper[days]
+        bin_width = self.bin_width[days]
+        results = np.empty((len(percentiles), len(days)))
+        for i, percentile in enumerate(percentiles):
+            rank = percentile / 100 * (self.total - 1)  # np.percentile 의 linear 방식과 같은 순위
+            bin_index = np.sum(cumulative_counts <= rank, axis=1)
+            bin_index = np.minimum(bin_index, self.num_bins + 1)
+            count_in_bin = counts[rows, bin_index]
+            count_before = cumulative_counts[rows, bin_index] - count_in_bin
+            fraction = np.divide(rank - count_before + 0.5, count_in_bin,
+                                 out=np.full(len(days), 0.5), where=count_in_bin > 0)
+            values = lower + (bin_index - 1 + np.clip(fraction, 0, 1)) * bin_width
+            values[bin_index == 0] = lower[bin_index == 0]
+            values[bin_index == self.num_bins + 1] = upper[bin_index == self.num_bins + 1]
+            results[i] = values
+        return results
+
+# Function to pick a chunk size so that one chunk of paths stays within the memory budget
+def default_chunk_size(num_days, memory_bytes=DEFAULT_CHUNK_MEMORY_BYTES, dtype=np.float64):
+    # 청크 하나에 경로 행렬 크기의 임시 배열이 약 5개 필요 (누적 PnL, 고점, 낙폭, 히스토그램 인덱스 등)
+    return max(1, int(memory_bytes // (max(num_days, 1) * np.dtype(dtype).itemsize * 5)))
+
+# Largest number of grid points of the exact final PnL distribution (beyond that the grid is coarsened)
+EXACT_MAX_POINTS = 2 ** 20
+
+# Discrete probability distribution, used for the metrics that are computed exactly instead of sampled
+class DiscreteDistribution:
+    def __init__(self, values, probabilities):
+        self.values = np.asarray(values, dtype=float)
+        self.probabilities = np.array(probabilities, dtype=float)
+        if np.any(self.values[1:] < self.values[:-1]):
+            order = np.argsort(self.values, kind='stable')
+            self.values, self.probabilities = self.values[order], self.probabilities[order]
+        self.probabilities /= self.probabilities.sum()
+
+    @classmethod
+    def from_sorted(cls, values, probabilities):
+        """ Wrap values that are already sorted with normalised probabilities, without copying them
+        (e.g. memory-mapped arrays of a stored run). """
+        distribution = cls.__new__(cls)
+        distribution.values, distribution.probabilities = values, probabilities
+        return distribution
+
+    def mean(self):
+        return float(np.dot(self.values, self.probabilities))
+
+    def quantiles(self, percentiles):
+        """ Smallest value whose cumulative probability reaches every percentile (inverse CDF). """
+        cdf = np.cumsum(self.probabilities)
+        targets = np.asarray(percentiles, dtype=float) / 100 - 1e-12  # 누적확률의 반올림 오차 허용
+        return self.values[np.minimum(np.searchsorted(cdf, targets), len(cdf) - 1)]
+
+    def transform(self, function):
+        """ Distribution of function(value), e.g. the CAGR of a final PnL. """
+        return DiscreteDistribution(function(self.values), self.probabilities)
+
+# Function to find the tick that every return is a whole multiple of (e.g. 0.1 Pt), or None
+def return_tick(returns, max_decimals=6):
+    for decimals in range(max_decimals + 1):
+        scaled = np.asarray(returns, dtype=float) * 10**decimals
+        units = np.round(scaled)
+        if np.all(np.abs(scaled - units) < 1e-6):
+            return np.gcd.reduce(units.astype(np.int64)) / 10**decimals or None
+    return None
+
+# Function to choose the grid (lowest return, step, bins per day) that the daily return distribution is put on
+def exact_grid(returns, num_days, max_points=EXACT_MAX_POINTS):
+    """ The step is the common tick of the returns unless the sum of num_days returns would need more
+    than max_points points; then the step is widened to fit. """
+    low, high = returns.min(), returns.max()
+    if low == high:
+        return low, 1.0, 1
+    step = return_tick(returns)
+    bins_per_day = round((high - low) / step) if step is not None else None
+    if step is None or num_days * bins_per_day + 1 > max_points:
+        bins_per_day = max(1, (max_points - 1) // num_days)
+        step = (high - low) / bins_per_day
+    return low, step, bins_per_day + 1
+
+# Function to put daily returns on a grid, splitting every return linearly between its two neighbouring points
+def grid_weights(returns, low, step, num_bins):
+    """ Returns the weight of every grid point (one per return in total), which keeps the mean exact. """
+    positions = (returns - low) / step
+    lower = np.minimum(np.floor(positions + 1e-9).astype(np.int64), num_bins - 1)
+    upper_weight = np.clip(positions - lower, 0, 1)
+    upper_weight[upper_weight < 1e-9] = 0  # 격자 위의 값은 그대로 한 점에 둠
+    return np.bincount(lower, 1 - upper_weight, num_bins) + np.bincount(lower + 1, upper_weight, num_bins + 1)[:-1]
+
+# Function to calculate the distribution of the sum of num_days i.i.d. draws from weights on a grid
+def grid_sum_distribution(day_weights, num_days, low, step):
+    """ The one-day distribution is raised to the num_days-th power in Fourier space, which is the
+    num_days-fold convolution. """
+    day_pmf = day_weights / day_weights.sum()
+    # n 일 합의 지지 구간 전체가 들어가는 크기로 FFT 해서 순환 겹침이 없도록 함
+    num_points = num_days * (len(day_pmf) - 1) + 1
+    fft_size = 1 << (num_points - 1).bit_length()
+    sum_pmf = np.fft.irfft(np.fft.rfft(day_pmf, fft_size) ** num_days, fft_size)[:num_points]
+    np.clip(sum_pmf, 0, None, out=sum_pmf)
+    return DiscreteDistribution(num_days * low + np.arange(num_points) * step, sum_pmf)
+
+# Function to calculate the exact distribution of the final PnL, the sum of num_days i.i.d. daily returns
+def exact_final_pnl_distribution(returns, num_days=None, max_points=EXACT_MAX_POINTS):
+    """ Exact on the grid of the common tick of the returns; see exact_grid for longer sums. """
+    returns = np.asarray(returns, dtype=float)
+    num_days = len(returns) if num_days is None else num_days
+    low, step, num_bins = exact_grid(returns, num_days, max_points)
+    return grid_sum_distribution(grid_weights(returns, low, step, num_bins), num_days, low, step)
+
+# Function to calculate the log probabilities of a binomial distribution
+def binomial_log_pmf(k, n, p, log_factorials):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_pmf = (log_factorials[np.clip(n, 0, None)] - log_factorials[np.clip(k, 0, None)]
+                   - log_factorials[np.clip(n - k, 0, None)]
+                   + np.where(k > 0, k * np.log(p), 0) + np.where(n - k > 0, (n - k) * np.log1p(-p), 0))
+    return np.where((k >= 0) & (k <= n), log_pmf, -np.inf)
+
+# Function to calculate the distribution of the win rate from the daily probabilities of a non-zero and a winning day
+def win_rate_distribution(num_days, p_non_zero, p_win, num_sigmas=12):
+    """ The number of non-zero days K is binomial, and the number of profitable days among them is
+    binomial given K. Counts more than num_sigmas standard deviations from their mean are left out
+    (their probability is far below the resolution of any percentile). """
+    if p_non_zero == 0:
+        return DiscreteDistribution([0.0], [1.0])
+    log_factorials = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, num_days + 1)))])
+
+    spread = num_sigmas * math.sqrt(num_days * p_non_zero * (1 - p_non_zero)) + 1
+    non_zero = np.arange(max(0, math.floor(num_days * p_non_zero - spread)),
+                         min(num_days, math.ceil(num_days * p_non_zero + spread)) + 1)
+    win_spread = num_sigmas * math.sqrt(non_zero[-1] * p_win * (1 - p_win)) + 1
+    wins = np.arange(max(0, math.floor(non_zero[0] * p_win - win_spread)),
+                     min(non_zero[-1], math.ceil(non_zero[-1] * p_win + win_spread)) + 1)
+
+    # 비제로 일수 K 와 그중 이익 일수 W 의 결합 확률을 격자로 한 번에 계산
+    non_zero, wins = non_zero[:, np.newaxis], wins[np.newaxis, :]
+    log_pmf = (binomial_log_pmf(non_zero, num_days, p_non_zero, log_factorials)
+               + binomial_log_pmf(wins, non_zero, p_win, log_factorials))
+    win_rate = np.divide(wins, non_zero, out=np.zeros(log_pmf.shape), where=non_zero > 0)
+    possible = np.broadcast_to(wins <= non_zero, log_pmf.shape)
+    return DiscreteDistribution(win_rate[possible], np.exp(log_pmf)[possible])
+
+# Function to calculate the exact distribution of the win rate (profitable days / non-zero days)
+def exact_win_rate_distribution(returns, num_days=None):
+    returns = np.asarray(returns, dtype=float)
+    num_days = len(returns) if num_days is None else num_days
+    non_zero_days = np.count_nonzero(returns)
+    return win_rate_distribution(num_days, non_zero_days / len(returns),
+                                 np.count_nonzero(returns > 0) / non_zero_days if non_zero_days else 0.0)
+
+# Metrics of the results table whose distribution is computed exactly (CAGR is a function of the final PnL)
+EXACT_METRICS = ('final_pnl', 'cagr', 'win_probability')
+
+# Function to calculate the distributions of the metrics that can be computed exactly from the returns
+def exact_distributions(returns):
+    """ The final PnL and the win rate of a path only depend on which returns were drawn, not on their
+    order, so their distributions follow from the return series alone. """
+    return {'final_pnl': exact_final_pnl_distribution(returns),
+            'win_probability': exact_win_rate_distribution(returns)}
+
+# Raised when a running simulation is cancelled through its cancel event
+class SimulationCancelled(Exception):
+    pass
+
+# Display names of the profiled stages, in pipeline order
+STAGE_LABELS = {
+    'excel_load': "엑셀",
+    'resample': "리샘플링",
+    'cumsum': "누적합",
+    'metrics': "지표",
+    'percentile_bands': "밴드",
+    'exact': "정확 분포",
+    'store': "저장",
+    'summary': "분위",
+    'plot': "그래프",
+}
+
+# Per-stage wall time, processed paths and peak memory of one run
+class RunProfile:
+    """ Stages are recorded with `with profile.stage(name, paths):` and may be nested or repeated
+    (repeats add up). Peak memory is measured with tracemalloc, which is only switched on while a
+    stage is running. Profiles of worker processes are combined with merge(); their stage times are
+    then the sum over workers, while the 'simulation' stage holds the wall time of the whole run. """
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+        self.info = {}
+        self._open_stages = []  # [start bytes, highest traced bytes] of the stages being recorded
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name, paths=0):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.track_memory:
+            # 바깥 단계의 최고치를 보존한 뒤 이 단계의 최고치를 새로 측정
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open_stages:
+                self._open_stages[-1][1] = max(self._open_stages[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._open_stages.append([current, current])
+        record = {'paths': paths}  # The caller may set record['paths'] when the count is only known at the end
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start_time
+            peak_bytes = 0
+            if self.track_memory:
+                frame = self._open_stages.pop()
+                frame[1] = max(frame[1], tracemalloc.get_traced_memory()[1])
+                peak_bytes = frame[1] - frame[0]
+                if self._open_stages:
+                    self._open_stages[-1][1] = max(self._open_stages[-1][1], frame[1])
+                elif self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+            self.add(name, seconds, record['paths'], peak_bytes)
+
+    def add(self, name, seconds, paths=0, peak_bytes=0, calls=1):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'paths': 0, 'peak_bytes': 0, 'calls': 0})
+        stage['seconds'] += seconds
+        stage['paths'] += paths
+        stage['peak_bytes'] = max(stage['peak_bytes'], peak_bytes)
+        stage['calls'] += calls
+
+    def merge(self, other):
+        for name, stage in other.stages.items():
+            self.add(name, stage['seconds'], stage['paths'], stage['peak_bytes'], stage['calls'])
+        return self
+
+    @property
+    def peak_bytes(self):
+        return max((stage['peak_bytes'] for stage in self.stages.values()), default=0)
+
+    def summary_line(self):
+        """ One-line summary for the status bar, e.g. "시뮬레이션 1.20초 | 엑셀 0.05초 · ... | 최대 메모리 210MB". """
+        parts = [f"{label} {self.stages[name]['seconds']:.2f}초" for name, label in STAGE_LABELS.items()
+                 if name in self.stages]
+        line = " · ".join(parts)
+        if 'simulation' in self.stages:
+            simulation = self.stages['simulation']
+            line = f"시뮬레이션 {simulation['seconds']:.2f}초 ({simulation['paths']:,} 경로) | " + line
+        if self.track_memory:
+            line += f" | 최대 메모리 {self.peak_bytes / 1024 ** 2:,.0f}MB"
+        return line
+
+    def to_dict(self):
+        return {'info': self.info, 'peak_bytes': self.peak_bytes, 'stages': self.stages}
+
+    def save_json(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+
+# Function to time a stage when a profile is given, and do nothing otherwise
+def profile_stage(profile, name, paths=0):
+    return profile.stage(name, paths) if profile is not None else _no_profile()
+
+@contextmanager
+def _no_profile():
+    yield {}
+
+# Function to simulate a share of the paths chunk by chunk with its own random generator
+def simulate_chunks(returns, num_simulations, initial_value, chunk_size, num_sample_paths, seed_sequence,
+                    dtype=np.float64, capital_sweep=False, path_file=None, resampling='iid',
+                    block_length=DEFAULT_BLOCK_LENGTH, progress_callback=None, cancel_event=None, profile=None):
+    """ Resample the daily returns in chunks of paths, keep the exact per-path metrics and a per-day
+    quantile sketch of each chunk, then discard the chunk. Runs in a worker process in parallel mode.
+    returns may also be a (num_days, num_columns) matrix of date-aligned strategies: every chunk then
+    draws one index matrix that all columns share, metrics is a list with one dict per column, and
+    the band sketch and sample paths follow the last column.
+    progress_callback(num_paths) is called after every chunk, and cancel_event (anything with
+    is_set()) is checked before every chunk. The stages of every chunk are recorded in profile
+    (a RunProfile) if given. capital_sweep keeps the drawdown frontier of every path in the metrics
+    (see compute_path_metrics). path_file is (npy file, first row): the cumulative PnL of every path
+    is written to those rows of the memory-mapped file. resampling and block_length choose the
+    resampling scheme (see resample_indices). Returns (metrics, band_sketch, sample_paths). """
+    rng = np.random.default_rng(seed_sequence)
+    returns = np.asarray(returns)
+    num_days = len(returns)
+    years = num_days / 252  # Typical trading year assumption: 252 trading days in a year
+    columns = np.ascontiguousarray(returns.reshape(num_days, -1).T, dtype=dtype)  # One row per strategy
+
+    band_sketch = DailyQuantileSketch.from_returns(returns.reshape(num_days, -1)[:, -1])
+    metric_chunks = []
+    sample_paths = np.empty((0, num_days))
+    stored_paths = np.load(path_file[0], mmap_mode='r+') if path_file is not None else None
+
+    for start in range(0, num_simulations, chunk_size):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SimulationCancelled()
+        size = min(chunk_size, num_simulations - start)
+        # 같은 날짜 인덱스를 모든 전략에 써서 전략 간 상관관계를 유지하고 난수는 한 번만 생성
+        with profile_stage(profile, 'resample', size):
+            indices = resample_indices(rng, num_days, size, num_days, resampling, block_length)
+        column_metrics = []
+        for column, column_returns in enumerate(columns):
+            with profile_stage(profile, 'resample'):
+                simulation_daily_returns = column_returns[indices]
+            with profile_stage(profile, 'metrics', size):
+                chunk_metrics = compute_return_metrics(simulation_daily_returns)
+
+            # 일별 수익 행렬을 그대로 누적 PnL 로 바꿔서 (in-place) 추가 복사 없이 사용
+            with profile_stage(profile, 'cumsum', size):
+                cumulative_simulations = np.cumsum(simulation_daily_returns, axis=1, out=simulation_daily_returns)
+            if column == len(columns) - 1:
+                with profile_stage(profile, 'percentile_bands', size):
+                    band_sketch.add(cumulative_simulations)
+                if stored_paths is not None:
+                    with profile_stage(profile, 'store', size):
+                        stored_paths[path_file[1] + start:path_file[1] + start + size] = cumulative_simulations
+                if len(sample_paths) < num_sample_paths:
+                    sample_paths = np.vstack([sample_paths,
+                                              cumulative_simulations[:num_sample_paths - len(sample_paths)]])
+            with profile_stage(profile, 'metrics'):
+                chunk_metrics.update(compute_path_metrics(cumulative_simulations, initial_value, years,
+                                                          in_place=True, drawdown_frontier=capital_sweep))
+            column_metrics.append(chunk_metrics)
+        metric_chunks.append(column_metrics if returns.ndim == 2 else column_metrics[0])
+        if progress_callback is not None:
+            progress_callback(size)
+
+    if stored_paths is not None:
+        stored_paths.flush()
+    metrics = merge_metrics(metric_chunks)
+    return metrics, band_sketch, sample_paths
+
+# Function to run simulate_chunks in a worker process with its own profile, returned with the results
+def simulate_chunks_with_profile(*args):
+    profile = RunProfile()
+    return simulate_chunks(*args, profile=profile) + (profile,)
+
+# Worker processes, and the queue/event that carry progress and cancellation to them, shared by several runs
+@dataclass
+class WorkerPool:
+    executor: ProcessPoolExecutor
+    progress: object = None  # Manager queue the workers put their finished path counts on
+    cancel: object = None  # Manager event the workers check before every chunk
+
+# Function to start a WorkerPool that several run_streaming_simulation calls can share
+@contextmanager
+def worker_pool(num_workers, progress_and_cancel=True):
+    """ Starting processes (and a Manager for progress_and_cancel) is slow, above all with the spawn
+    start method, where every process imports numpy and pandas again; a pool kept open for a whole
+    adaptive or repeated run pays it once. """
+    # 작업자 프로세스는 스레드 이벤트를 볼 수 없으므로 Manager 의 큐/이벤트로 진행률과 취소를 전달
+    manager = multiprocessing.Manager() if progress_and_cancel else None
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            yield WorkerPool(executor, manager.Queue() if manager is not None else None,
+                             manager.Event() if manager is not None else None)
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+# Function to concatenate per-path metric arrays of several chunks or workers
+def merge_metrics(metric_chunks):
+    # 포트폴리오 모드에서는 청크마다 전략별 지표 dict 의 리스트가 들어옴
+    if isinstance(metric_chunks[0], list):
+        return [merge_metrics(list(column_chunks)) for column_chunks in zip(*metric_chunks)]
+    return {key: np.concatenate([chunk[key] for chunk in metric_chunks]) for key in metric_chunks[0]}
+
+# Function to run the Monte Carlo simulation chunk by chunk with bounded memory, optionally on several processes
+def run_streaming_simulation(returns, num_simulations, initial_value, chunk_size=None, num_sample_paths=20,
+                             seed=None, num_workers=1, progress_callback=None, cancel_event=None,
+                             dtype=np.float64, profile=None, capital_sweep=False, path_file=None, resampling='iid',
+                             block_length=DEFAULT_BLOCK_LENGTH, pool=None):
+    """ Peak memory depends on chunk_size only (per worker), not on num_simulations.
+    The paths are split across num_workers processes, each with a generator spawned from
+    SeedSequence(seed), so the same (seed, num_workers) gives bit-identical results. seed may also
+    be a SeedSequence.
+    progress_callback(num_paths) is called in the calling thread as chunks finish, and setting
+    cancel_event stops every worker before its next chunk with SimulationCancelled.
+    dtype=np.float32 halves the memory of the path matrices at the cost of float32 rounding.
+    Stage timings of every worker are merged into profile (a RunProfile) if given.
+    capital_sweep keeps what SimulationResult.with_capital needs in the metrics, and path_file (an .npy
+    file name) receives the whole (num_simulations, num_days) cumulative PnL matrix, written chunk by
+    chunk through a memory map so it never has to fit in memory. resampling and block_length choose
+    the resampling scheme (see resample_indices). pool is an open WorkerPool (see worker_pool) with at
+    least num_workers processes to use instead of starting new ones; it needs its progress queue and
+    cancel event if progress_callback or cancel_event is given.
+    Returns (metrics, band_sketch, sample_paths) where sample_paths holds the cumulative PnL of the
+    first num_sample_paths paths for plotting. """
+    returns = np.asarray(returns, dtype=float)
+    num_days = len(returns)
+    num_workers = max(1, min(num_workers, num_simulations))
+    if chunk_size is None:
+        chunk_size = default_chunk_size(num_days, DEFAULT_CHUNK_MEMORY_BYTES // num_workers, dtype)
+
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    seed_sequences = seed_sequence.spawn(num_workers)
+    worker_simulations = [len(share) for share in np.array_split(np.arange(num_simulations), num_workers)]
+    if path_file is not None:
+        # 파일을 미리 만들어 두고 각 작업자가 자기 행 구간에만 씀
+        np.lib.format.open_memmap(path_file, mode='w+', dtype=dtype, shape=(num_simulations, num_days)).flush()
+    first_rows = np.concatenate([[0], np.cumsum(worker_simulations)[:-1]])
+    worker_args = [(returns, worker_simulations[i], initial_value, chunk_size, num_sample_paths, seed_sequences[i],
+                    dtype, capital_sweep, (path_file, int(first_rows[i])) if path_file is not None else None,
+                    resampling, block_length)
+                   for i in range(num_workers)]
+
+    if num_workers == 1:
+        return simulate_chunks(*worker_args[0], progress_callback, cancel_event, profile)
+
+    if pool is None:
+        pool_context = worker_pool(num_workers, progress_callback is not None or cancel_event is not None)
+    else:
+        pool_context = nullcontext(pool)
+    with pool_context as pool:
+        worker_progress, worker_cancel = pool.progress, pool.cancel
+        worker_function = simulate_chunks_with_profile if profile is not None else simulate_chunks
+        futures = [pool.executor.submit(worker_function, *args,
+                                        worker_progress.put if worker_progress is not None else None, worker_cancel)
+                   for args in worker_args]
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+            if cancel_event is not None and cancel_event.is_set():
+                worker_cancel.set()
+            if progress_callback is not None:
+                while not worker_progress.empty():
+                    progress_callback(worker_progress.get())
+            failed = [future for future in futures if future.done() and future.exception() is not None]
+            if failed:
+                if worker_cancel is not None:
+                    worker_cancel.set()  # Stop the other workers early
+                raise failed[0].exception()
+        worker_results = [future.result() for future in futures]
+
+    # 작업자 순서대로 결과를 합쳐서 같은 시드/작업자 수에서는 항상 같은 결과가 나오도록 함
+    metric_chunks = []
+    band_sketch = None
+    sample_paths = np.empty((0, num_days))
+    for metrics, worker_sketch, worker_paths, *worker_profile in worker_results:
+        if profile is not None:
+            profile.merge(worker_profile[0])
+        metric_chunks.append(metrics)
+        band_sketch = worker_sketch if band_sketch is None else band_sketch.merge(worker_sketch)
+        sample_paths = np.vstack([sample_paths, worker_paths])[:num_sample_paths]
+
+    return merge_metrics(metric_chunks), band_sketch, sample_paths
+
+# Rows of the results table: (label, metric key, base strategy key, value format, descending percentiles)
+RESULT_ROWS = [
+    ("최종 PnL", 'final_pnl', 'final_value', 'number', False),
+    ("승률", 'win_probability', 'win_probability', 'percent', False),
+    ("평균 손익비", 'profit_loss_ratio', 'profit_loss_ratio', 'number', False),
+    ("CAGR", 'cagr', 'cagr', 'percent', False),
+    ("최대 낙폭 (MDD)", 'max_drawdown', 'max_drawdown', 'percent', True),  # MDD는 내림차순
+    ("월 샤프 비율", 'sharpe_ratio', 'sharpe_ratio', 'number', False),
+    ("보상비율", 'reward_ratio', 'reward_ratio', 'number', False),
+    ("최대 underwater 기간", 'max_underwater_period', 'max_underwater_period', 'days', True),  # underwater는 내림차순
+]
+
+# Function to format one value of the results table
+def format_result_value(value, value_format):
+    if value_format == 'percent':
+        return f"{value:.2%}"
+    if value_format == 'days':
+        return f"{math.ceil(value)} 일"
+    return f"{value:.2f}"
+
+# Function to calculate the metrics of the base strategy (the original return series)
+def compute_base_metrics(returns, initial_value):
+    returns = np.asarray(returns, dtype=float)
+    years = len(returns) / 252  # Typical trading year assumption: 252 trading days in a year
+    metrics = compute_simulation_metrics(returns[np.newaxis, :], initial_value, years)
+    return {key: values[0].item() for key, values in metrics.items() if not key.startswith('drawdown_frontier')}
+
+# Result of one Monte Carlo run
+@dataclass
+class SimulationResult:
+    returns: np.ndarray
+    num_simulations: int
+    initial_value: float
+    base_metrics: dict
+    metrics: dict  # Per-path metric arrays, one value per simulated path
+    band_sketch: DailyQuantileSketch
+    sample_paths: np.ndarray
+    seed: object = None
+    num_workers: int = 1
+    sheet_name: str = None
+    profile: RunProfile = None
+    convergence: dict = None  # Set by simulate_until_converged
+    multiplier: float = 1.0  # Contract multiplier applied to the simulated PnL by with_capital
+    exact: dict = None  # Exact distributions of the order-independent metrics (see exact_distributions)
+    paths: np.ndarray = None  # Memory-mapped cumulative PnL of every path if stored, before the multiplier
+    summary_rows: list = None  # Results table saved with a stored run, returned by summary() as is
+    resampling: str = 'iid'  # Resampling scheme of the paths (see resample_indices)
+    block_length: float = None  # Block length of the 'block' and 'stationary' schemes
+
+    @property
+    def num_days(self):
+        return len(self.returns)
+
+    def bands(self, percentiles=BAND_PERCENTILES, days=None):
+        """ Per-day cumulative PnL at the given percentiles, shape (len(percentiles), num_days),
+        or only at the given day indices. """
+        return self.band_sketch.quantiles(percentiles, days) * self.multiplier
+
+    def capital_metrics(self, initial_value, multiplier=1.0):
+        """ Per-path final PnL, final value, CAGR, MDD and reward ratio for another initial capital and
+        contract multiplier, evaluated from the drawdown frontier of every path instead of the path
+        matrix. Needs a result simulated with capital_sweep=True. Matches a new simulation as long as
+        the capital exceeds the loss of the first day, so the account value is positive at its peaks. """
+        if 'drawdown_frontier_count' not in self.metrics:
+            raise ValueError("Run the simulation with capital_sweep=True to evaluate other capitals.")
+        if initial_value <= 0 or multiplier <= 0:
+            raise ValueError("The initial capital and the multiplier must be positive.")
+        count = self.metrics['drawdown_frontier_count']
+        peak = self.metrics['drawdown_frontier_peak']
+        depth = self.metrics['drawdown_frontier_depth']
+        capital = initial_value / multiplier  # 초기 자본을 시뮬레이션한 PnL 단위로 환산
+
+        # MDD 는 각 경로의 (고점, 낙폭) 쌍 중 낙폭 / (자본 + 고점) 의 최댓값
+        max_drawdown = np.zeros(len(count))
+        max_drawdown_amount = np.zeros(len(count))
+        in_drawdown = count > 0
+        if in_drawdown.any():
+            ratio = np.divide(depth, capital + peak, out=np.zeros(len(depth)), where=capital + peak != 0)
+            ends = np.cumsum(count)
+            max_drawdown[in_drawdown] = np.maximum.reduceat(ratio, (ends - count)[in_drawdown])
+            max_drawdown_amount[in_drawdown] = depth[ends[in_drawdown] - 1] * multiplier  # 낙폭은 점점 깊어지므로 마지막 쌍이 최대
+
+        final_pnl = self.metrics['final_pnl'] / self.multiplier * multiplier
+        final_value = initial_value + final_pnl
+        return {
+            'final_pnl': final_pnl,
+            'final_value': final_value,
+            'cagr': compute_cagr(final_value, initial_value, self.num_days / 252),
+            'max_drawdown': max_drawdown,
+            'reward_ratio': np.divide(final_value, max_drawdown_amount, out=np.full(len(final_value), np.inf),
+                                      where=max_drawdown != 0),
+        }
+
+    def with_capital(self, initial_value, multiplier=1.0):
+        """ Copy of the result for another initial capital and contract multiplier, without simulating
+        again. Win rate, profit/loss ratio, Sharpe ratio and underwater period do not depend on either. """
+        metrics = dict(self.metrics, **self.capital_metrics(initial_value, multiplier))
+        scale = multiplier / self.multiplier
+        returns = self.returns * scale
+        return replace(self, returns=returns, initial_value=initial_value, multiplier=multiplier, metrics=metrics,
+                       base_metrics=compute_base_metrics(returns, initial_value), sample_paths=self.sample_paths * scale,
+                       summary_rows=None)
+
+    def metric_statistics(self, key, percentiles=RESULT_PERCENTILES):
+        """ (mean, values at percentiles) of one metric. Final PnL, CAGR (a function of the final PnL)
+        and win rate come from the exact distributions when the result has them, so they carry no
+        sampling noise; the other metrics come from the simulated paths. """
+        distribution = None
+        if self.exact is not None and key == 'win_probability':
+            distribution = self.exact['win_probability']
+        elif self.exact is not None and key in EXACT_METRICS:
+            distribution = self.exact['final_pnl'].transform(lambda values: values * self.multiplier)
+            if key == 'cagr':
+                distribution = distribution.transform(
+                    lambda values: compute_cagr(self.initial_value + values, self.initial_value, self.num_days / 252))
+        if distribution is not None:
+            return distribution.mean(), distribution.quantiles(percentiles)
+        return np.mean(self.metrics[key]), np.percentile(self.metrics[key], percentiles)
+
+    def summary(self):
+        """ Results table as a list of dicts with the base strategy value, the mean and the percentiles.
+        Percentiles of the descending rows (MDD, underwater period) are reversed, as in the GUI. """
+        if self.summary_rows is not None:
+            return self.summary_rows
+        rows = []
+        for label, key, base_key, value_format, descending in RESULT_ROWS:
+            mean, percentile_values = self.metric_statistics(key)
+            if descending:
+                percentile_values = np.flip(percentile_values)
+            row = {'지표': label, '기본전략': self.base_metrics[base_key], '평균': mean}
+            row.update({f"{p}% 분위": value for p, value in zip(RESULT_PERCENTILES, percentile_values)})
+            rows.append(row)
+        return rows
+
+    def formatted_rows(self):
+        """ Results table as tuples of display strings, in the column order of the GUI table. """
+        formatted_rows = []
+        for row, (label, _, _, value_format, _) in zip(self.summary(), RESULT_ROWS):
+            values = [row['기본전략'], row['평균']] + [row[f"{p}% 분위"] for p in RESULT_PERCENTILES]
+            formatted_rows.append(tuple([label] + [format_result_value(value, value_format) for value in values]))
+        return formatted_rows
+
+    def convergence_summary(self):
+        """ One line with the number of paths used and the achieved precision in adaptive mode. """
+        if self.convergence is None:
+            return ""
+        state = "수렴" if self.convergence['converged'] else "최대 횟수 도달"
+        return (f"{state}: {self.num_simulations:,} 경로, 최대 분위 오차 {self.convergence['precision']:.2%} "
+                f"(허용 {self.convergence['tolerance']:.2%}, 표준편차 대비)")
+
+# Columns of the capital sweep table: (metric key, percentile as labelled in the results table)
+SWEEP_COLUMNS = [('max_drawdown', 5), ('max_drawdown', 50), ('cagr', 50), ('cagr', 5), ('reward_ratio', 50)]
+
+# Function to tabulate the capital-dependent metrics of a result over a grid of initial capitals and multipliers
+def sweep_capital(result, initial_values, multipliers=(1,), columns=SWEEP_COLUMNS):
+    """ One row per (initial capital, multiplier) with the percentiles of columns, all evaluated from the
+    paths simulated once (see SimulationResult.with_capital and percentile_columns). Pivot the
+    DataFrame on '초기 자본' and '거래승수' for a heatmap. """
+    rows = []
+    for multiplier in multipliers:
+        for initial_value in initial_values:
+            row = {'초기 자본': initial_value, '거래승수': multiplier}
+            row.update(percentile_columns(result.with_capital(initial_value, multiplier), columns))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+# Function to pick single percentiles of a result as "<label> <percentile>% 분위" columns
+def percentile_columns(result, columns):
+    """ columns is a list of (metric key, percentile). Percentiles of the descending rows follow the
+    results table, so "5% 분위" of MDD is the worst 5%. """
+    rows_by_key = {key: (label, descending) for label, key, _, _, descending in RESULT_ROWS}
+    values = {}
+    for key, percentile in columns:
+        label, descending = rows_by_key[key]
+        _, (value,) = result.metric_statistics(key, [100 - percentile if descending else percentile])
+        values[f"{label} {percentile}% 분위"] = value
+    return values
+
+# Directory for the parsed return series, so a workbook is only parsed again when it changes
+RETURNS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".yestrader_montecarlo", "returns_cache")
+
+# Function to select the daily returns (second column) of a parsed sheet
+def extract_returns(data):
+    # Select the second column
+    if data.shape[1] < 2:
+        raise ValueError("The sheet must contain at least two columns.")
+    returns = data.iloc[:, 1].dropna()  # Select the second column and drop any missing values
+    return returns.to_numpy(dtype=float)
+
+# Function to identify the exact contents of a workbook file
+def file_cache_key(file_path):
+    """ (absolute path, mtime, size, sha256 of the contents) of the file. """
+    stat = os.stat(file_path)
+    content_hash = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            content_hash.update(block)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, content_hash.hexdigest()
+
+# Function to select the date column (first) and the daily returns of a parsed sheet, one column per strategy
+def extract_daily_table(data, all_columns=False):
+    """ Returns a DataFrame indexed by date with the second column only, or with every numeric column
+    after the date when all_columns is set. Rows without a date are dropped and rows of the same
+    date are summed, so the result can be aligned with the tables of other sheets. """
+    if data.shape[1] < 2:
+        raise ValueError("The sheet must contain at least two columns.")
+    dates = pd.to_datetime(data.iloc[:, 0], errors='coerce')
+    if dates.isna().all():
+        raise ValueError("The first column must contain the dates to align the strategies on.")
+    table = data.iloc[:, 1:] if all_columns else data.iloc[:, [1]]
+    table = table.apply(pd.to_numeric, errors='coerce').dropna(axis=1, how='all')
+    if table.shape[1] == 0:
+        raise ValueError("The sheet has no numeric return column.")
+    return table[dates.notna()].groupby(dates[dates.notna()]).sum()
+
+# Function to convert a daily table into plain arrays that can be stored in the cache
+def table_arrays(table):
+    return {'dates': table.index.to_numpy(dtype='datetime64[ns]'), 'values': table.to_numpy(dtype=float),
+            'columns': np.array([str(column) for column in table.columns])}
+
+# Function to get the cache file of one sheet of a workbook
+def returns_cache_path(file_key, sheet_name, kind='returns'):
+    # 시트 이름이 비어 있으면 첫 번째 시트를 뜻함
+    parts = file_key + (sheet_name or "",) + (() if kind == 'returns' else (kind,))
+    key = "|".join(str(part) for part in parts)
+    return os.path.join(RETURNS_CACHE_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest() + ".npz")
+
+# Function to read the cached arrays of a sheet as a dict, or None when there is no usable cache entry
+def read_returns_cache(cache_path):
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            return {key: cached[key] for key in cached.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+# Function to store the arrays of a sheet in the cache (failures only cost a re-parse next time)
+def write_returns_cache(cache_path, arrays):
+    try:
+        os.makedirs(RETURNS_CACHE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=RETURNS_CACHE_DIR, suffix=".npz")
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, cache_path)  # Atomic, so a concurrent reader never sees a partial file
+    except OSError:
+        pass
+
+# Function to parse several sheets of one Excel file into arrays, through the cache
+def load_cached_sheets(file_path, sheet_names, kind, parse_sheet, use_cache=True):
+    """ Returns a list with one dict of arrays per requested sheet (None or "" for the first sheet):
+    the arrays returned by parse_sheet(data) plus 'sheet_name'. kind names what parse_sheet extracts,
+    so different extractions of a sheet are cached separately. Sheets found in the cache are not
+    parsed at all, and the workbook is opened at most once. """
+    file_key = file_cache_key(file_path) if use_cache else None
+    loaded = []
+    xls = None
+    try:
+        for sheet_name in sheet_names:
+            cache_path = returns_cache_path(file_key, sheet_name, kind) if use_cache else None
+            cached = read_returns_cache(cache_path) if use_cache else None
+            if cached is not None:
+                loaded.append(cached)
+                continue
+
+            if xls is None:
+                xls = pd.ExcelFile(file_path)
+            # Load the first sheet by default and get its name
+            resolved_sheet_name = sheet_name or xls.sheet_names[0]
+            arrays = dict(parse_sheet(xls.parse(resolved_sheet_name)), sheet_name=np.array(resolved_sheet_name))
+            if use_cache:
+                write_returns_cache(cache_path, arrays)
+            loaded.append(arrays)
+    finally:
+        if xls is not None:
+            xls.close()
+    return loaded
+
+# Function to load the daily returns of several sheets of one Excel file
+def load_sheets_returns(file_path, sheet_names, use_cache=True):
+    """ Returns a list of (returns, sheet_name), one per requested sheet (None or "" for the first sheet). """
+    loaded = load_cached_sheets(file_path, sheet_names, 'returns',
+                                lambda data: {'returns': extract_returns(data)}, use_cache)
+    return [(arrays['returns'], str(arrays['sheet_name'])) for arrays in loaded]
+
+# Name of the combined portfolio in the results of a portfolio run
+PORTFOLIO_NAME = "포트폴리오"
+
+# Function to load the daily returns of several strategies aligned on date
+def load_portfolio_returns(sources, all_columns=False, use_cache=True):
+    """ sources is a list of (file_path, sheet_name). Returns a DataFrame of daily PnL indexed by
+    date with one column per strategy: the second column of every sheet, or every numeric column
+    when all_columns is set. A day on which a strategy has no row counts as 0 for that strategy. """
+    file_paths = list(dict.fromkeys(file_path for file_path, _ in sources))
+    frames = []
+    for file_path in file_paths:
+        sheet_names = [sheet_name for source_path, sheet_name in sources if source_path == file_path]
+        kind = 'table_all' if all_columns else 'table'
+        parse_sheet = lambda data: table_arrays(extract_daily_table(data, all_columns))
+        for arrays in load_cached_sheets(file_path, sheet_names, kind, parse_sheet, use_cache):
+            # 여러 파일이면 파일 이름을, 여러 열이면 열 이름을 붙여서 전략 이름이 겹치지 않게 함
+            prefix = str(arrays['sheet_name'])
+            if len(file_paths) > 1:
+                prefix = f"{os.path.basename(file_path)}:{prefix}"
+            names = [f"{prefix}:{column}" if all_columns else prefix for column in arrays['columns']]
+            frames.append(pd.DataFrame(arrays['values'], index=arrays['dates'], columns=names))
+    return pd.concat(frames, axis=1, join='outer').fillna(0).sort_index()
+
+# Function to load the daily returns (second column) of an Excel sheet
+def load_returns(file_path, sheet_name=None, use_cache=True):
+    """ Returns (returns, sheet_name). The first sheet is used when sheet_name is empty. """
+    return load_sheets_returns(file_path, [sheet_name], use_cache)[0]
+
+# Function to run a Monte Carlo simulation without any GUI
+def simulate(returns, num_simulations, initial_value, seed=None, num_workers=1, chunk_size=None,
+             num_sample_paths=20, sheet_name=None, progress_callback=None, cancel_event=None, dtype=np.float64,
+             profile=None, capital_sweep=False, path_file=None, resampling='iid', block_length=DEFAULT_BLOCK_LENGTH):
+    """ Resample the daily returns num_simulations times and return a SimulationResult with the
+    per-path metrics, the plot bands and the base strategy metrics.
+    See run_streaming_simulation for progress_callback, cancel_event, profile and path_file. With
+    capital_sweep the result can be re-evaluated for other initial capitals (see
+    SimulationResult.with_capital). With a block resampling scheme (see resample_indices) the final
+    PnL no longer has the distribution of a sum of independent days, so every row is sampled. """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        raise ValueError("The return series is empty.")
+    if num_simulations < 1:
+        raise ValueError("The number of simulations must be at least 1.")
+
+    with profile_stage(profile, 'simulation', num_simulations):
+        metrics, band_sketch, sample_paths = run_streaming_simulation(returns, num_simulations, initial_value,
+                                                                      chunk_size, num_sample_paths, seed, num_workers,
+                                                                      progress_callback, cancel_event, dtype, profile,
+                                                                      capital_sweep, path_file, resampling, block_length)
+    with profile_stage(profile, 'exact'):
+        exact = exact_distributions(returns) if resampling == 'iid' else None
+    return SimulationResult(returns=returns, num_simulations=num_simulations, initial_value=initial_value,
+                            base_metrics=compute_base_metrics(returns, initial_value), metrics=metrics,
+                            band_sketch=band_sketch, sample_paths=sample_paths, seed=seed,
+                            num_workers=num_workers, sheet_name=sheet_name, profile=profile, exact=exact,
+                            paths=np.load(path_file, mmap_mode='r') if path_file is not None else None,
+                            resampling=resampling, block_length=block_length if resampling != 'iid' else None)
+
+# Function to run a Monte Carlo simulation of several strategies traded together
+def simulate_portfolio(strategy_returns, num_simulations, initial_value, seed=None, num_workers=1,
+                       chunk_size=None, num_sample_paths=20, strategy_names=None, progress_callback=None,
+                       cancel_event=None, dtype=np.float64, profile=None, capital_sweep=False, path_file=None,
+                       resampling='iid', block_length=DEFAULT_BLOCK_LENGTH):
+    """ strategy_returns is a (num_days, num_strategies) table of date-aligned daily returns, e.g.
+    from load_portfolio_returns (its columns name the strategies). Whole days are resampled jointly
+    with one index matrix shared by every strategy and by their sum, so the correlation between the
+    strategies is kept (with a block resampling scheme, whole runs of days). Returns a dict of
+    SimulationResult keyed by strategy name, followed by the combined portfolio under PORTFOLIO_NAME;
+    only the portfolio result has plot bands (and the stored paths when path_file is given). """
+    if strategy_names is None and isinstance(strategy_returns, pd.DataFrame):
+        strategy_names = [str(column) for column in strategy_returns.columns]
+    strategy_returns = np.asarray(strategy_returns, dtype=float)
+    if strategy_names is None:
+        strategy_names = [f"전략 {i + 1}" for i in range(strategy_returns.shape[-1])]
+    if strategy_returns.ndim != 2 or len(strategy_returns) == 0:
+        raise ValueError("The portfolio needs a non-empty (days, strategies) table of returns.")
+    if num_simulations < 1:
+        raise ValueError("The number of simulations must be at least 1.")
+
+    # 합계 열을 마지막에 붙여서 같은 인덱스로 함께 리샘플링 (밴드와 샘플 경로는 마지막 열 기준)
+    returns = np.column_stack([strategy_returns, strategy_returns.sum(axis=1)])
+    with profile_stage(profile, 'simulation', num_simulations):
+        metrics, band_sketch, sample_paths = run_streaming_simulation(returns, num_simulations, initial_value,
+                                                                      chunk_size, num_sample_paths, seed, num_workers,
+                                                                      progress_callback, cancel_event, dtype, profile,
+                                                                      capital_sweep, path_file, resampling, block_length)
+
+    results = {}
+    for column, name in enumerate(list(strategy_names) + [PORTFOLIO_NAME]):
+        is_portfolio = column == len(strategy_names)
+        with profile_stage(profile, 'exact'):
+            exact = exact_distributions(returns[:, column]) if resampling == 'iid' else None
+        results[name] = SimulationResult(
+            returns=returns[:, column], num_simulations=num_simulations, initial_value=initial_value,
+            base_metrics=compute_base_metrics(returns[:, column], initial_value), metrics=metrics[column],
+            band_sketch=band_sketch if is_portfolio else None,
+            sample_paths=sample_paths if is_portfolio else np.empty((0, len(returns))), seed=seed,
+            num_workers=num_workers, sheet_name=name, profile=profile, exact=exact,
+            paths=np.load(path_file, mmap_mode='r') if path_file is not None and is_portfolio else None,
+            resampling=resampling, block_length=block_length if resampling != 'iid' else None)
+    return results
+
+# Function to estimate how precisely the percentiles of one metric are known
+def percentile_precision(values, percentiles=RESULT_PERCENTILES, z=1.96):
+    """ Half-width of the distribution-free 95% confidence interval of each percentile, taken from the
+    order statistics at ranks n*q -/+ z*sqrt(n*q*(1-q)), divided by the standard deviation of the
+    finite values so that metrics in points, percent and days can share one tolerance. An interval
+    that only spans two neighbouring values of a discrete metric counts as fully resolved (0). """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    q = np.asarray(percentiles) / 100
+    spread = z * np.sqrt(n * q * (1 - q))
+    low_rank = np.clip(np.floor(n * q - spread), 0, n - 1).astype(int)
+    high_rank = np.clip(np.ceil(n * q + spread), 0, n - 1).astype(int)
+    ordered = np.partition(values, np.unique(np.concatenate([low_rank, high_rank])))
+    with np.errstate(invalid='ignore'):
+        half_width = (ordered[high_rank] - ordered[low_rank]) / 2
+    half_width[np.isnan(half_width)] = 0  # Both ends infinite: the percentile is exactly inf
+    # 승률이나 underwater 일수처럼 값이 띄엄띄엄한 지표는 구간이 인접한 두 값에 걸치면 더 좁힐 수 없으므로 수렴으로 봄
+    for i, (low, high) in enumerate(zip(low_rank, high_rank)):
+        if half_width[i] > 0 and len(np.unique(ordered[low:high + 1])) <= 2:
+            half_width[i] = 0
+
+    finite_values = values[np.isfinite(values)]
+    scale = np.std(finite_values) if len(finite_values) else 0.0
+    return np.divide(half_width, scale, out=np.where(half_width == 0, 0.0, np.inf), where=scale > 0)
+
+# Function to run batches of simulations until every percentile of the results table is stable
+def simulate_until_converged(returns, initial_value, tolerance=0.02, batch_size=10000, max_simulations=1000000,
+                             seed=None, num_workers=1, chunk_size=None, num_sample_paths=20, sheet_name=None,
+                             progress_callback=None, cancel_event=None, dtype=np.float64, profile=None,
+                             capital_sweep=False, resampling='iid', block_length=DEFAULT_BLOCK_LENGTH):
+    """ Adaptive version of simulate(): adds batches of batch_size paths until the precision of every
+    percentile of every sampled results-table metric (see percentile_precision; the EXACT_METRICS
+    rows need no sampling with i.i.d. resampling) is at most tolerance, or
+    max_simulations paths have been used. The result's convergence dict holds the achieved precision,
+    the precision per metric and the history of (paths, worst precision) after every batch. """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        raise ValueError("The return series is empty.")
+    if batch_size < 1 or max_simulations < 1:
+        raise ValueError("The batch size and the maximum number of simulations must be at least 1.")
+
+    # 배치마다 부모 SeedSequence 에서 새 시드를 파생해서, 같은 시드면 같은 배치 순서가 재현됨
+    root_seed_sequence = np.random.SeedSequence(seed)
+    metric_batches = []
+    band_sketch = None
+    sample_paths = None
+    num_simulations = 0
+    history = []
+    converged = False
+
+    # 작업자 프로세스는 배치마다 새로 띄우지 않고 전체 실행 동안 한 번만 띄움
+    if num_workers > 1:
+        pool_context = worker_pool(num_workers, progress_callback is not None or cancel_event is not None)
+    else:
+        pool_context = nullcontext()
+    with profile_stage(profile, 'simulation') as stage, pool_context as pool:
+        while num_simulations < max_simulations:
+            size = min(batch_size, max_simulations - num_simulations)
+            batch_metrics, batch_sketch, batch_paths = run_streaming_simulation(
+                returns, size, initial_value, chunk_size, num_sample_paths, root_seed_sequence.spawn(1)[0],
+                num_workers, progress_callback, cancel_event, dtype, profile, capital_sweep,
+                resampling=resampling, block_length=block_length, pool=pool)
+            num_simulations += size
+
+            # 배치는 목록에 쌓아 두고 정밀도를 볼 지표만 이어 붙임 (전체 병합은 마지막에 한 번)
+            metric_batches.append(batch_metrics)
+            band_sketch = batch_sketch if band_sketch is None else band_sketch.merge(batch_sketch)
+            sample_paths = batch_paths if sample_paths is None else sample_paths
+
+            metric_precision = {label: float(np.max(percentile_precision(
+                                    np.concatenate([batch[key] for batch in metric_batches]))))
+                                for label, key, _, _, _ in RESULT_ROWS
+                                if resampling != 'iid' or key not in EXACT_METRICS}
+            history.append((num_simulations, max(metric_precision.values())))
+            if history[-1][1] <= tolerance:
+                converged = True
+                break
+        stage['paths'] = num_simulations
+    metrics = merge_metrics(metric_batches)
+
+    with profile_stage(profile, 'exact'):
+        exact = exact_distributions(returns) if resampling == 'iid' else None
+    return SimulationResult(returns=returns, num_simulations=num_simulations, initial_value=initial_value,
+                            base_metrics=compute_base_metrics(returns, initial_value), metrics=metrics,
+                            band_sketch=band_sketch, sample_paths=sample_paths, seed=seed,
+                            num_workers=num_workers, sheet_name=sheet_name, profile=profile, exact=exact,
+                            resampling=resampling, block_length=block_length if resampling != 'iid' else None,
+                            convergence={'converged': converged, 'tolerance': tolerance,
+                                         'precision': history[-1][1], 'metric_precision': metric_precision,
+                                         'history': history})
+
+# Columns of the walk-forward table: (metric key, percentile as labelled in the results table)
+WALK_FORWARD_COLUMNS = [('max_drawdown', 5), ('max_drawdown', 50), ('cagr', 50), ('cagr', 5),
+                        ('max_underwater_period', 5), ('max_underwater_period', 50)]
+
+# Function to calculate the exact distributions of rolling windows of the return series, window after window
+def walk_forward_exact(returns, starts, window_days, max_points=EXACT_MAX_POINTS // 4, profile=None):
+    """ Yields the exact_distributions of returns[start:start + window_days] for every start (increasing),
+    all on the grid of the whole series. The grid weights and the win/non-zero counts are updated with
+    the days that enter and leave the window instead of being recounted. """
+    low, step, num_bins = exact_grid(returns, window_days, max_points)
+    day_weights = np.zeros(num_bins)
+    non_zero_days = winning_days = 0
+    previous_start = None
+    for start in starts:
+        end = start + window_days
+        if previous_start is None or start >= previous_start + window_days:
+            # 처음이거나 간격이 창보다 길어 겹치는 날이 없으면 새로 셈
+            entering, leaving = returns[start:end], returns[:0]
+            day_weights[:] = 0
+            non_zero_days = winning_days = 0
         else:
-            if current_duration > 0:
-                underwater_durations.append(current_duration)
-            current_duration = 0
+            entering = returns[previous_start + window_days:end]
+            leaving = returns[previous_start:start]
+        with profile_stage(profile, 'exact'):
+            day_weights += grid_weights(entering, low, step, num_bins) - grid_weights(leaving, low, step, num_bins)
+            np.clip(day_weights, 0, None, out=day_weights)
+            non_zero_days += np.count_nonzero(entering) - np.count_nonzero(leaving)
+            winning_days += np.count_nonzero(entering > 0) - np.count_nonzero(leaving > 0)
+            win_rate = winning_days / non_zero_days if non_zero_days else 0.0
+            exact = {'final_pnl': grid_sum_distribution(day_weights, window_days, low, step),
+                     'win_probability': win_rate_distribution(window_days, non_zero_days / window_days, win_rate)}
+        previous_start = start
+        yield exact
+
+# Function to run the Monte Carlo simulation on rolling windows of the return series
+def walk_forward(returns, window_days, step_days, num_simulations, initial_value, seed=None, chunk_size=None,
+                 columns=WALK_FORWARD_COLUMNS, dtype=np.float64, exact_max_points=EXACT_MAX_POINTS // 4,
+                 progress_callback=None, cancel_event=None, profile=None, resampling='iid',
+                 block_length=DEFAULT_BLOCK_LENGTH):
+    """ Every window of window_days days, stepped by step_days, is simulated with num_simulations
+    paths of its own length. All windows share one random index matrix per chunk (common random
+    numbers), so the random draws happen once and the changes from window to window come from the
+    data rather than from sampling noise. The grid weights and win/non-zero counts of the exact
+    distributions are updated incrementally as days enter and leave the window (i.i.d. resampling only;
+    with a block scheme, see resample_indices, every column is sampled). Only the sampled metrics of
+    columns are kept per window, so memory grows as windows x num_simulations x sampled columns.
+    progress_callback(num_paths) is called once per chunk and window. Returns a DataFrame with one
+    row per window ('시작', '끝' day indices, end exclusive) and the percentile columns (see
+    percentile_columns). """
+    returns = np.asarray(returns, dtype=float)
+    if not 2 <= window_days <= len(returns) or step_days < 1:
+        raise ValueError("The window must be 2 days up to the length of the series, and the step at least 1 day.")
+    if num_simulations < 1:
+        raise ValueError("The number of simulations must be at least 1.")
+    starts = list(range(0, len(returns) - window_days + 1, step_days))
+    chunk_size = chunk_size or default_chunk_size(window_days, dtype=dtype)
+    rng = np.random.default_rng(seed)
+    years = window_days / 252  # Typical trading year assumption: 252 trading days in a year
+    windows = [returns[start:start + window_days].astype(dtype) for start in starts]
+    # 창마다 표의 열이 표본에서 읽는 지표만 보관 (i.i.d. 에서는 CAGR 도 정확 분포에서 계산)
+    sampled_keys = {key for key, _ in columns if resampling != 'iid' or key not in EXACT_METRICS}
+
+    # 청크마다 인덱스 행렬을 한 번만 뽑아서 모든 창에 같이 사용
+    metric_chunks = [[] for _ in starts]
+    for chunk_start in range(0, num_simulations, chunk_size):
+        size = min(chunk_size, num_simulations - chunk_start)
+        with profile_stage(profile, 'resample', size):
+            indices = resample_indices(rng, window_days, size, window_days, resampling, block_length)
+        for window, window_returns in enumerate(windows):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SimulationCancelled()
+            with profile_stage(profile, 'resample'):
+                simulation_daily_returns = window_returns[indices]
+            with profile_stage(profile, 'metrics', size):
+                chunk_metrics = compute_return_metrics(simulation_daily_returns)
+            with profile_stage(profile, 'cumsum', size):
+                cumulative_simulations = np.cumsum(simulation_daily_returns, axis=1, out=simulation_daily_returns)
+            with profile_stage(profile, 'metrics'):
+                chunk_metrics.update(compute_path_metrics(cumulative_simulations, initial_value, years, in_place=True))
+            metric_chunks[window].append({key: chunk_metrics[key] for key in sampled_keys})
+            if progress_callback is not None:
+                progress_callback(size)
+
+    # 정확 분포는 i.i.d. 일 때만 (블록 방식에서는 모든 열을 표본에서 계산)
+    if resampling == 'iid':
+        exact_windows = walk_forward_exact(returns, starts, window_days, exact_max_points, profile)
+    else:
+        exact_windows = [None] * len(starts)
+    rows = []
+    for window, (start, exact) in enumerate(zip(starts, exact_windows)):
+        end = start + window_days
+        window_returns = returns[start:end]
+        result = SimulationResult(returns=window_returns, num_simulations=num_simulations,
+                                  initial_value=initial_value,
+                                  base_metrics=compute_base_metrics(window_returns, initial_value),
+                                  metrics=merge_metrics(metric_chunks[window]), band_sketch=None,
+                                  sample_paths=np.empty((0, window_days)), seed=seed, exact=exact,
+                                  resampling=resampling)
+        row = {'시작': start, '끝': end}
+        row.update(percentile_columns(result, columns))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+# Function to draw the percentiles of a walk-forward table as time series, one axes per metric
+def draw_walk_forward(figure, table, title=None):
+    figure.clear()
+    value_columns = [column for column in table.columns if column not in ('시작', '끝')]
+    labels = list(dict.fromkeys(column.rsplit(' ', 2)[0] for column in value_columns))
+    axes = figure.subplots(len(labels), 1, sharex=True, squeeze=False)[:, 0]
+    for ax, label in zip(axes, labels):
+        for column in value_columns:
+            if column.rsplit(' ', 2)[0] == label:
+                ax.plot(table['끝'], table[column], label=column.rsplit(' ', 2)[1] + " 분위")
+        ax.set_ylabel(label)
+        ax.legend(loc='upper left', fontsize=8)
+    axes[-1].set_xlabel('창 마지막 거래일')
+    if title:
+        figure.suptitle(title)
+    return axes
+
+# Function to write the results tables of several runs to CSV or JSON
+def write_results(results, output_path, output_format=None):
+    """ results is a list of (file_path, sheet_name, SimulationResult). The format follows the
+    extension of output_path unless output_format ('csv' or 'json') is given. """
+    rows = [dict({'파일': file_path, '시트': sheet_name}, **row)
+            for file_path, sheet_name, result in results for row in result.summary()]
+    write_table(pd.DataFrame(rows), output_path, output_format)
+
+# Function to write a table to CSV or JSON
+def write_table(table, output_path, output_format=None):
+    output_format = output_format or ('json' if output_path.lower().endswith('.json') else 'csv')
+    if output_format == 'json':
+        table.to_json(output_path, orient='records', force_ascii=False, indent=2)
+    else:
+        table.to_csv(output_path, index=False, encoding='utf-8-sig')  # BOM so that Excel shows Korean correctly
+
+# Directory of the stored runs, one subdirectory per run
+RUNS_DIR = os.path.join(os.path.expanduser("~"), ".yestrader_montecarlo", "runs")
+
+# Function to identify the exact return series a run was simulated from
+def returns_hash(returns):
+    return hashlib.sha256(np.ascontiguousarray(returns, dtype=float).tobytes()).hexdigest()
+
+# Function to create a new, empty run directory in the store
+def create_run_dir(sheet_name=None, store_dir=None):
+    """ The name starts with the creation time and the sheet name, so runs list in order. """
+    store_dir = store_dir or RUNS_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    label = "".join(c if c.isalnum() else "_" for c in str(sheet_name or "run"))[:40]
+    return tempfile.mkdtemp(prefix=f"{time.strftime('%Y%m%d-%H%M%S')}_{label}_", dir=store_dir)
+
+# Function to save a run to the store: parameters and results table as JSON, every array as its own .npy file
+def save_run(result, run_dir=None, source=None, store_dir=None):
+    """ A result simulated with path_file=os.path.join(run_dir, 'paths.npy') keeps its path matrix
+    there. run.json is written last, so a directory without it is an incomplete run. source is any
+    JSON-serialisable description of the input (e.g. the file and sheet). Returns the run directory. """
+    run_dir = run_dir or create_run_dir(result.sheet_name, store_dir)
+    arrays = {'returns': result.returns, 'sample_paths': result.sample_paths}
+    arrays.update({f"metrics_{key}": values for key, values in result.metrics.items()})
+    if result.band_sketch is not None:
+        arrays.update(sketch_lower=result.band_sketch.lower, sketch_upper=result.band_sketch.upper,
+                      sketch_counts=result.band_sketch.counts)
+    for name, distribution in (result.exact or {}).items():
+        arrays.update({f"exact_{name}_values": distribution.values,
+                       f"exact_{name}_probabilities": distribution.probabilities})
+    for name, values in arrays.items():
+        np.save(os.path.join(run_dir, f"{name}.npy"), np.asarray(values))
+
+    info = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'sheet_name': result.sheet_name,
+        'source': source,
+        'input_hash': returns_hash(result.returns),
+        'num_simulations': result.num_simulations,
+        'num_days': result.num_days,
+        'initial_value': result.initial_value,
+        'multiplier': result.multiplier,
+        'resampling': result.resampling,
+        'block_length': result.block_length,
+        'seed': result.seed if result.seed is None or isinstance(result.seed, int) else str(result.seed),
+        'num_workers': result.num_workers,
+        'metrics': list(result.metrics),
+        'exact': list(result.exact or {}),
+        'sketch_total': result.band_sketch.total if result.band_sketch is not None else None,
+        'has_paths': os.path.exists(os.path.join(run_dir, 'paths.npy')),
+        'base_metrics': result.base_metrics,
+        'convergence': result.convergence,
+        'profile': result.profile.to_dict() if result.profile is not None else None,
+        'summary': result.summary(),
+    }
+    with open(os.path.join(run_dir, 'run.json'), 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2, default=float)
+    return run_dir
+
+# Function to reopen a stored run as a SimulationResult, memory-mapping every array instead of reading it
+def open_run(run_dir):
+    """ Nothing is recomputed: the results table is the stored one, and the per-path metrics, bands
+    and the optional path matrix (result.paths) are read from disk only when they are used. """
+    with open(os.path.join(run_dir, 'run.json'), encoding='utf-8') as f:
+        info = json.load(f)
+    load = lambda name: np.load(os.path.join(run_dir, f"{name}.npy"), mmap_mode='r')
+
+    band_sketch = None
+    if info['sketch_total'] is not None:
+        band_sketch = DailyQuantileSketch.from_arrays(load('sketch_lower'), load('sketch_upper'),
+                                                      load('sketch_counts'), info['sketch_total'])
+    exact = {name: DiscreteDistribution.from_sorted(load(f"exact_{name}_values"), load(f"exact_{name}_probabilities"))
+             for name in info['exact']} or None
+    return SimulationResult(returns=load('returns'), num_simulations=info['num_simulations'],
+                            initial_value=info['initial_value'], base_metrics=info['base_metrics'],
+                            metrics={key: load(f"metrics_{key}") for key in info['metrics']},
+                            band_sketch=band_sketch, sample_paths=load('sample_paths'), seed=info['seed'],
+                            num_workers=info['num_workers'], sheet_name=info['sheet_name'],
+                            convergence=info['convergence'], multiplier=info['multiplier'], exact=exact,
+                            paths=load('paths') if info['has_paths'] else None, summary_rows=info['summary'],
+                            resampling=info.get('resampling', 'iid'), block_length=info.get('block_length'))
+
+# Function to list the stored runs, newest first
+def list_runs(store_dir=None):
+    """ Returns the run.json contents of every complete run, with its directory under 'run_dir'. """
+    store_dir = store_dir or RUNS_DIR
+    runs = []
+    for name in sorted(os.listdir(store_dir), reverse=True) if os.path.isdir(store_dir) else []:
+        try:
+            with open(os.path.join(store_dir, name, 'run.json'), encoding='utf-8') as f:
+                runs.append(dict(json.load(f), run_dir=os.path.join(store_dir, name)))
+        except (OSError, ValueError):
+            continue  # Incomplete or unreadable run
+    return runs
+
+# Disk budget of the run store kept by the GUI; older runs beyond it are deleted after every save
+RUNS_MAX_BYTES = 2 * 1024**3
+
+# Function to get the disk size of a stored run
+def run_size(run_dir):
+    with os.scandir(run_dir) as entries:
+        return sum(entry.stat().st_size for entry in entries if entry.is_file())
+
+# Function to delete a stored run
+def delete_run(run_dir):
+    """ run.json is removed first, so a run that cannot be deleted completely (e.g. an array still
+    memory-mapped on Windows) is left as an incomplete run that list_runs skips. """
+    os.remove(os.path.join(run_dir, 'run.json'))
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+# Function to remove the directory of a run that was never saved (cancelled or failed), if any
+def discard_incomplete_run(run_dir):
+    if run_dir is not None and not os.path.exists(os.path.join(run_dir, 'run.json')):
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+# Function to delete the oldest stored runs until the store fits in max_bytes
+def prune_runs(store_dir=None, max_bytes=RUNS_MAX_BYTES, keep=()):
+    """ Runs are kept newest first while they fit in max_bytes; the runs in keep (directories, e.g.
+    the ones just saved) are never deleted but count towards the budget. Returns the deleted run
+    directories. """
+    keep = {os.path.abspath(run_dir) for run_dir in keep}
+    total = 0
+    deleted = []
+    for run in list_runs(store_dir):
+        try:
+            total += run_size(run['run_dir'])
+            if total > max_bytes and os.path.abspath(run['run_dir']) not in keep:
+                delete_run(run['run_dir'])
+                deleted.append(run['run_dir'])
+        except OSError:
+            continue  # Deleted concurrently or in use: try again after the next save
+    return deleted
+
+# Function to send one JSON request to the job server and return its decoded JSON answer
+def server_request(url, payload=None, timeout=30):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.loads(e.read().decode('utf-8') or '{}').get('error', str(e))) from None
+
+# Function to run a simulation on a local job server (montecarlo_server.py) instead of in this process
+def simulate_on_server(server_url, file_path, num_simulations, initial_value, sheet_name=None, seed=None,
+                       progress_callback=None, cancel_event=None, poll_seconds=0.5, resampling='iid',
+                       block_length=DEFAULT_BLOCK_LENGTH):
+    """ The server simulates each distinct (file contents, sheet, simulations, initial value, seed,
+    resampling scheme) once and saves it to the run store, so the result is opened memory-mapped with open_run.
+    Cancelling only stops waiting: the job may be shared with other clients. """
+    job = server_request(server_url.rstrip('/') + '/jobs', {
+        'file': os.path.abspath(file_path), 'sheet': sheet_name or None, 'simulations': num_simulations,
+        'initial_value': initial_value, 'seed': seed, 'resampling': resampling, 'block_length': block_length})
+    reported = 0
+    while True:
+        if progress_callback is not None and job['progress'] > reported:
+            progress_callback(job['progress'] - reported)
+            reported = job['progress']
+        if job['status'] == 'done':
+            return open_run(job['run_dir'])
+        if job['status'] == 'error':
+            raise RuntimeError(job['error'])
+        if cancel_event is not None and cancel_event.wait(poll_seconds):
+            raise SimulationCancelled()
+        if cancel_event is None:
+            time.sleep(poll_seconds)
+        job = server_request(f"{server_url.rstrip('/')}/jobs/{job['id']}")
+
+# Function to run the simulation for a list of Excel files and sheets from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="예스트레이더 몬테카를로 분석기 (배치 모드)")
+    parser.add_argument('files', nargs='+', help="엑셀 파일 경로")
+    parser.add_argument('-s', '--sheet', action='append', dest='sheets',
+                        help="시트 이름 (여러 번 지정 가능, 기본값: 첫 번째 시트)")
+    parser.add_argument('-n', '--simulations', type=int, default=1000, help="시뮬레이션 횟수 (기본값: 1000)")
+    parser.add_argument('-i', '--initial-value', type=float, default=4000, help="초기 자본, 단위: Pt (기본값: 4000)")
+    parser.add_argument('--seed', type=int, default=None, help="난수 시드")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="병렬 작업 수 (기본값: 1)")
+    parser.add_argument('-o', '--output', required=True, help="결과 파일 경로 (.csv 또는 .json)")
+    parser.add_argument('--format', choices=['csv', 'json'], default=None, help="결과 파일 형식")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="지정하면 모든 분위의 오차(표준편차 대비)가 이 값 이하가 될 때까지 배치로 실행, -n 은 최대 횟수")
+    parser.add_argument('--batch-size', type=int, default=10000, help="수렴 모드의 배치 크기 (기본값: 10000)")
+    parser.add_argument('--float32', action='store_true', help="경로 행렬을 float32 로 계산 (메모리 절반, 정밀도 낮음)")
+    parser.add_argument('--no-cache', action='store_true', help="엑셀 캐시를 사용하지 않고 항상 다시 읽기")
+    parser.add_argument('--sweep-capital', type=float, nargs='+', default=None,
+                        help="지정한 초기 자본들에 대해 경로를 다시 만들지 않고 MDD/CAGR 분위를 계산해 <출력>_sweep 파일로 저장")
+    parser.add_argument('--sweep-multipliers', type=float, nargs='+', default=[1],
+                        help="자본 스윕에 쓸 거래승수 목록 (기본값: 1)")
+    parser.add_argument('--walk-forward', type=int, nargs=2, default=None, metavar=('WINDOW', 'STEP'),
+                        help="WINDOW 일 길이의 창을 STEP 일씩 옮기며 시뮬레이션한 분위 추이를 <출력>_walk_forward 파일로 저장")
+    parser.add_argument('--portfolio', action='store_true',
+                        help="모든 파일/시트의 전략을 날짜로 맞춰 하나의 포트폴리오로 함께 시뮬레이션")
+    parser.add_argument('--all-columns', action='store_true',
+                        help="포트폴리오 모드에서 시트의 둘째 열부터 모든 숫자 열을 각각 전략으로 사용 (--portfolio 포함)")
+    parser.add_argument('--resampling', choices=list(RESAMPLING_METHODS), default='iid',
+                        help="리샘플링 방식: iid (일별 독립), block (고정 블록), stationary (기하분포 길이 블록) (기본값: iid)")
+    parser.add_argument('--block-length', type=int, default=DEFAULT_BLOCK_LENGTH,
+                        help=f"block/stationary 의 (평균) 블록 길이, 거래일 (기본값: {DEFAULT_BLOCK_LENGTH})")
+    parser.add_argument('--save-run', action='store_true',
+                        help=f"각 실행의 설정과 결과를 실행 저장소({RUNS_DIR})에 저장하고 경로를 출력")
+    parser.add_argument('--save-paths', action='store_true',
+                        help="전체 경로 행렬도 실행 저장소에 저장 (--save-run 포함, 시뮬레이션 횟수 x 일수 크기)")
+    args = parser.parse_args(argv)
+    if args.save_paths and args.tolerance is not None:
+        parser.error("--save-paths 는 --tolerance 와 함께 사용할 수 없습니다.")
+    if (args.portfolio or args.all_columns) and args.tolerance is not None:
+        parser.error("--tolerance 는 포트폴리오 모드에서 사용할 수 없습니다.")
+
+    results = []
+    dtype = np.float32 if args.float32 else np.float64
+    capital_sweep = args.sweep_capital is not None
+    resampling = dict(resampling=args.resampling, block_length=args.block_length)
+    if args.portfolio or args.all_columns:
+        sources = [(file_path, sheet_name) for file_path in args.files for sheet_name in args.sheets or [None]]
+        table = load_portfolio_returns(sources, args.all_columns, not args.no_cache)
+        run_dir = create_run_dir(PORTFOLIO_NAME) if args.save_paths else None
+        portfolio = simulate_portfolio(table, args.simulations, args.initial_value, seed=args.seed,
+                                       num_workers=args.workers, dtype=dtype, capital_sweep=capital_sweep,
+                                       path_file=os.path.join(run_dir, 'paths.npy') if run_dir else None, **resampling)
+        results = [(", ".join(args.files), name, result, run_dir if name == PORTFOLIO_NAME else None)
+                   for name, result in portfolio.items()]
+        print(f"포트폴리오 ({len(table.columns)}개 전략): {len(table)}일, {args.simulations}회 완료", file=sys.stderr)
+    else:
+        for file_path in args.files:
+            for returns, sheet_name in load_sheets_returns(file_path, args.sheets or [None], not args.no_cache):
+                run_dir = None
+                if args.tolerance is not None:
+                    result = simulate_until_converged(returns, args.initial_value, args.tolerance, args.batch_size,
+                                                      args.simulations, seed=args.seed, num_workers=args.workers,
+                                                      sheet_name=sheet_name, dtype=dtype, capital_sweep=capital_sweep,
+                                                      **resampling)
+                else:
+                    if args.save_paths:
+                        run_dir = create_run_dir(sheet_name)
+                    result = simulate(returns, args.simulations, args.initial_value, seed=args.seed,
+                                      num_workers=args.workers, sheet_name=sheet_name, dtype=dtype,
+                                      capital_sweep=capital_sweep,
+                                      path_file=os.path.join(run_dir, 'paths.npy') if run_dir else None, **resampling)
+                results.append((file_path, sheet_name, result, run_dir))
+                print(f"{file_path} [{sheet_name}]: {len(returns)}일, {result.num_simulations}회 완료 "
+                      f"{result.convergence_summary()}", file=sys.stderr)
+
+    if args.save_run or args.save_paths:
+        for file_path, sheet_name, result, run_dir in results:
+            run_dir = save_run(result, run_dir, source={'file': file_path, 'sheet': sheet_name})
+            print(f"{file_path} [{sheet_name}] 저장: {run_dir}", file=sys.stderr)
+    results = [(file_path, sheet_name, result) for file_path, sheet_name, result, _ in results]
+    write_results(results, args.output, args.format)
+    root, extension = os.path.splitext(args.output)
+    if capital_sweep:
+        sweep_rows = [dict({'파일': file_path, '시트': sheet_name}, **row)
+                      for file_path, sheet_name, result in results
+                      for row in sweep_capital(result, args.sweep_capital, args.sweep_multipliers).to_dict('records')]
+        write_table(pd.DataFrame(sweep_rows), f"{root}_sweep{extension}", args.format)
+    if args.walk_forward is not None:
+        window_days, step_days = args.walk_forward
+        walk_forward_rows = [dict({'파일': file_path, '시트': sheet_name}, **row)
+                             for file_path, sheet_name, result in results
+                             for row in walk_forward(result.returns, window_days, step_days, args.simulations,
+                                                     args.initial_value, seed=args.seed, dtype=dtype,
+                                                     **resampling).to_dict('records')]
+        write_table(pd.DataFrame(walk_forward_rows), f"{root}_walk_forward{extension}", args.format)
+    return 0
+
+# Function to pick the days to draw so that a plot never has more points than the screen has pixels
+def plot_day_indices(num_days, max_points):
+    if num_days <= max_points:
+        return np.arange(num_days)
+    return np.unique(np.linspace(0, num_days - 1, max(max_points, 2)).round().astype(int))
+
+# Persistent plot of the simulated cumulative PnL bands
+class SimulationPlot:
+    """ One matplotlib Figure and Axes created once; every run only updates the data of the existing
+    median line, band polygons and sample path lines, so no figures or canvases pile up. """
+
+    def __init__(self, figsize=(12, 5), num_sample_paths=20):
+        from matplotlib.figure import Figure  # Not pyplot, so the figure is not kept in pyplot's global registry
+
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        ax = self.ax
+        empty = np.empty(0)
+
+        # Median line, percentile shading and a few individual simulation paths
+        self.median_line, = ax.plot(empty, empty, label='Median', color='blue', linewidth=2)
+        self.outer_band = ax.fill_between(empty, empty, empty, color='lightblue', alpha=0.3, label='5th-95th Percentile')
+        self.inner_band = ax.fill_between(empty, empty, empty, color='blue', alpha=0.3, label='25th-75th Percentile')
+        self.sample_lines = [ax.plot(empty, empty, color='gray', alpha=0.5, linewidth=0.8)[0]
+                             for _ in range(num_sample_paths)]
+
+        # Median and 5th-95th band of a second run overlaid for comparison, hidden until one is given
+        self.comparison_line, = ax.plot(empty, empty, label='Median (비교)', color='darkorange', linewidth=2)
+        self.comparison_band = ax.fill_between(empty, empty, empty, color='orange', alpha=0.2,
+                                               label='5th-95th Percentile (비교)')
+        self.comparison_line.set_visible(False)
+        self.comparison_band.set_visible(False)
+
+        # Set titles and labels
+        ax.set_xlabel('일수', fontsize=12)
+        ax.set_ylabel('누적 PnL (Pt)', fontsize=12)
+        ax.grid(True, linestyle='--', alpha=0.5)
 
-    if current_duration > 0:
-        underwater_durations.append(current_duration)
+        # Add legend
+        self.set_legend()
+
+    def set_legend(self):
+        handles = [self.median_line, self.outer_band, self.inner_band, self.comparison_line, self.comparison_band]
+        self.ax.legend(handles=[handle for handle in handles if handle.get_visible()])
+
+    @staticmethod
+    def set_band(band, days, lower, upper):
+        band.set_verts([np.column_stack([np.concatenate([days, days[::-1]]), np.concatenate([lower, upper[::-1]])])])
+
+    def update(self, result, max_points=1200, comparison=None):
+        """ Redraw with the bands of result, evaluated only at max_points evenly spaced days.
+        The median and outer band of comparison (another result) are overlaid if given. A result
+        without a band sketch (a strategy of a portfolio run) draws no bands; its sample paths, if
+        any, are still drawn. """
+        num_days = max(result.num_days, comparison.num_days if comparison is not None else 0)
+        days = plot_day_indices(num_days, max_points)
+        result_days = days[days < result.num_days]
+
+        # 밴드가 없는 결과 (포트폴리오의 전략별 실행) 는 밴드를 숨기고 범위 계산에서 제외
+        has_bands = result.band_sketch is not None
+        for artist in (self.median_line, self.outer_band, self.inner_band):
+            artist.set_visible(has_bands)
+        y_min, y_max = np.inf, -np.inf
+        if has_bands:
+            percentiles = result.bands(BAND_PERCENTILES, result_days)
+            self.median_line.set_data(result_days, percentiles[2])
+            self.set_band(self.outer_band, result_days, percentiles[0], percentiles[4])
+            self.set_band(self.inner_band, result_days, percentiles[1], percentiles[3])
+            y_min, y_max = percentiles.min(), percentiles.max()
+
+        sample_paths = result.sample_paths[:, result_days]
+        for i, line in enumerate(self.sample_lines):
+            line.set_visible(i < len(sample_paths))
+            if i < len(sample_paths):
+                line.set_data(result_days, sample_paths[i])
+
+        title = f'{result.sheet_name}에 대한 몬테카를로 시뮬레이션'
+        y_min = min(y_min, sample_paths.min(initial=np.inf))
+        y_max = max(y_max, sample_paths.max(initial=-np.inf))
+        has_comparison = comparison is not None and comparison.band_sketch is not None
+        self.comparison_line.set_visible(has_comparison)
+        self.comparison_band.set_visible(has_comparison)
+        if has_comparison:
+            comparison_days = days[days < comparison.num_days]
+            comparison_percentiles = comparison.bands((5, 50, 95), comparison_days)
+            self.comparison_line.set_data(comparison_days, comparison_percentiles[1])
+            self.set_band(self.comparison_band, comparison_days, comparison_percentiles[0], comparison_percentiles[2])
+            y_min = min(y_min, comparison_percentiles.min())
+            y_max = max(y_max, comparison_percentiles.max())
+        if comparison is not None:
+            title = f'{result.sheet_name} / {comparison.sheet_name} 몬테카를로 시뮬레이션 비교'
+        self.set_legend()
+
+        # 밴드(PolyCollection)는 autoscale 대상이 아니므로 축 범위를 직접 지정
+        if y_min > y_max:  # 그릴 데이터가 없음
+            y_min = y_max = 0.0
+        margin = (y_max - y_min) * 0.05 or 1.0
+        self.ax.set_xlim(0, max(num_days - 1, 1))
+        self.ax.set_ylim(y_min - margin, y_max + margin)
+        self.ax.set_title(title, fontsize=16)
+
+# Function to set matplotlib font to support Korean characters
+def set_korean_font():
+    plt.rcParams['font.family'] = 'Malgun Gothic'  # 'Malgun Gothic' is commonly used in Windows for Korean
+    plt.rcParams['axes.unicode_minus'] = False  # Ensure minus sign is shown correctly
 
-    return max(underwater_durations) if underwater_durations else 0
+# Function to read the resampling scheme and block length chosen in the window
+def read_resampling():
+    resampling = list(RESAMPLING_METHODS)[resampling_combobox.current()]
+    block_length = int(block_length_entry.get()) if resampling != 'iid' else DEFAULT_BLOCK_LENGTH
+    if block_length < 1:
+        raise ValueError("블록 길이는 1일 이상이어야 합니다.")
+    return dict(resampling=resampling, block_length=block_length)
 
-# Function to perform Monte Carlo Simulation and calculate benchmarks
+# Function to start the Monte Carlo Simulation on a background thread so the window stays responsive
 def run_simulation():
     try:
-        # Set font for Korean display
-        set_korean_font()
-
-        # Get inputs from the entries
+        # Get inputs from the entries (Tk widgets must only be read on the main thread)
         file_path = file_path_entry.get()
         sheet_name = sheet_name_entry.get()
         num_simulations = int(simulation_entry.get())
         initial_value = float(initial_value_entry.get())
-
-        # Load the selected Excel file
-        if sheet_name:
-            data = pd.read_excel(file_path, sheet_name=sheet_name)
+        seed = int(seed_entry.get()) if seed_entry.get() else None
+        num_workers = int(workers_entry.get())
+        tolerance = float(tolerance_entry.get()) if tolerance_entry.get() else None
+        save_paths = save_paths_var.get() and tolerance is None
+        server_url = server_entry.get().strip() or None
+        resampling = read_resampling()
+    except Exception as e:
+        messagebox.showerror("오류", str(e))
+        return
+
+    profile = RunProfile()
+    profile.info.update(file_path=file_path, sheet_name=sheet_name, num_simulations=num_simulations,
+                        initial_value=initial_value, seed=seed, num_workers=num_workers, tolerance=tolerance,
+                        **resampling)
+
+    cancel_event.clear()
+    run_button.config(state=tk.DISABLED)
+    walk_forward_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL)
+    progress_bar.config(maximum=num_simulations, value=0)
+
+    worker = threading.Thread(target=simulation_worker, daemon=True,
+                              args=(file_path, sheet_name, num_simulations, initial_value, seed, num_workers,
+                                    tolerance, profile, save_paths, server_url, resampling))
+    worker.start()
+    app.after(100, poll_simulation_queue)
+
+# Function running on the worker thread: loads the data, simulates and hands the result back through the queue
+def simulation_worker(file_path, sheet_name, num_simulations, initial_value, seed, num_workers, tolerance, profile,
+                      save_paths=False, server_url=None, resampling=None):
+    """ Every finished run is saved to the run store; with save_paths its full path matrix as well.
+    With server_url the run is submitted to that job server instead of being computed here.
+    resampling holds the resampling and block_length arguments of simulate (i.i.d. if None). """
+    resampling = resampling or {}
+    run_dir = None
+    try:
+        # 시트 이름을 쉼표로 여러 개 입력하면 날짜로 맞춘 포트폴리오로 함께 시뮬레이션
+        sheet_names = [name.strip() for name in sheet_name.split(',') if name.strip()]
+        if server_url is not None:
+            if len(sheet_names) > 1 or tolerance is not None:
+                raise ValueError("작업 서버는 단일 시트의 일반 실행만 지원합니다.")
+            with profile.stage('simulation', num_simulations):
+                result = simulate_on_server(server_url, file_path, num_simulations, initial_value, sheet_name, seed,
+                                            progress_callback=lambda num_paths: simulation_queue.put(('progress', num_paths)),
+                                            cancel_event=cancel_event, **resampling)
+            result.profile = profile
+            simulation_queue.put(('done', result))
+            return
+        if len(sheet_names) > 1:
+            if tolerance is not None:
+                raise ValueError("수렴 모드는 포트폴리오에서 사용할 수 없습니다.")
+            with profile.stage('excel_load'):
+                table = load_portfolio_returns([(file_path, name) for name in sheet_names])
+            run_dir = create_run_dir(PORTFOLIO_NAME) if save_paths else None
+            result = simulate_portfolio(table, num_simulations, initial_value, seed=seed, num_workers=num_workers,
+                                        cancel_event=cancel_event, profile=profile, capital_sweep=True,
+                                        progress_callback=lambda num_paths: simulation_queue.put(('progress', num_paths)),
+                                        path_file=os.path.join(run_dir, 'paths.npy') if run_dir else None, **resampling)
+            with profile.stage('store'):
+                run_dirs = [save_run(strategy_result, run_dir if name == PORTFOLIO_NAME else None,
+                                     source={'file': file_path, 'sheet': sheet_name})
+                            for name, strategy_result in result.items()]
+                prune_runs(keep=run_dirs)
+            simulation_queue.put(('done', result))
+            return
+
+        # Load the selected Excel file and perform Monte Carlo simulation using daily returns
+        with profile.stage('excel_load'):
+            returns, sheet_name = load_returns(file_path, sheet_name)
+        options = dict(seed=seed, num_workers=num_workers, sheet_name=sheet_name, cancel_event=cancel_event,
+                       progress_callback=lambda num_paths: simulation_queue.put(('progress', num_paths)),
+                       profile=profile, capital_sweep=True, **resampling)
+        if tolerance is not None:
+            # 수렴 모드에서는 시뮬레이션 횟수가 최대 횟수
+            result = simulate_until_converged(returns, initial_value, tolerance,
+                                              max_simulations=num_simulations, **options)
+            run_dir = None
         else:
-            # Load the first sheet by default and get its name
-            xls = pd.ExcelFile(file_path)
-            sheet_name = xls.sheet_names[0]
-            data = pd.read_excel(file_path, sheet_name=sheet_name)
-
-        # Select the second column
-        if data.shape[1] < 2:
-            raise ValueError("The sheet must contain at least two columns.")
-        returns = data.iloc[:, 1].dropna()  # Select the second column and drop any missing values
-
-        # Perform Monte Carlo simulation using daily returns
-        num_days = len(returns)
-        simulation_daily_returns = np.zeros((num_simulations, num_days))
-
-        for i in range(num_simulations):
-            random_daily_returns = np.random.choice(returns, size=num_days, replace=True)
-            simulation_daily_returns[i] = random_daily_returns
-
-        # Create a figure for plotting cumulative PnL of simulations with seaborn style
-        sns.set_theme(style="whitegrid", font='Malgun Gothic')  # Apply seaborn whitegrid style
-
-        fig, ax = plt.subplots(figsize=(12, 5))
-        cumulative_simulations = np.cumsum(simulation_daily_returns, axis=1)  # Cumulative PnL for plotting
-
-        # Calculate percentiles for shading
-        percentiles = np.percentile(cumulative_simulations, [5, 25, 50, 75, 95], axis=0)
-        days = np.arange(num_days)
-
-        # Plot the median line
-        ax.plot(days, percentiles[2], label='Median', color='blue', linewidth=2)
-
-        # Fill between the percentiles for shading
-        ax.fill_between(days, percentiles[0], percentiles[4], color='lightblue', alpha=0.3, label='5th-95th Percentile')
-        ax.fill_between(days, percentiles[1], percentiles[3], color='blue', alpha=0.3, label='25th-75th Percentile')
-
-        # Plot a few individual simulation paths for better visualization
-        for i in range(min(num_simulations, 20)):  # Show up to 20 paths
-            ax.plot(days, cumulative_simulations[i], color='gray', alpha=0.5, linewidth=0.8)
-
-        # Highlight the first and last simulation paths
-        # ax.plot(days, cumulative_simulations[0], color='red', linestyle='--', alpha=0.7, label='First Simulation')
-        # ax.plot(days, cumulative_simulations[-1], color='green', linestyle='--', alpha=0.7, label='Last Simulation')
-
-        # Set titles and labels
-        # ax.set_title(f'Monte Carlo Simulation for {sheet_name}', fontsize=16)
-        # ax.set_xlabel('Days', fontsize=12)
-        # ax.set_ylabel('Cumulative PnL (Pt)', fontsize=12)
-        ax.set_title(f'{sheet_name}에 대한 몬테카를로 시뮬레이션', fontsize=16)
-        ax.set_xlabel('일수', fontsize=12)
-        ax.set_ylabel('누적 PnL (Pt)', fontsize=12)
-        ax.grid(True, linestyle='--', alpha=0.5)
+            run_dir = create_run_dir(sheet_name) if save_paths else None
+            result = simulate(returns, num_simulations, initial_value,
+                              path_file=os.path.join(run_dir, 'paths.npy') if run_dir else None, **options)
+        with profile.stage('store'):
+            prune_runs(keep=[save_run(result, run_dir, source={'file': file_path, 'sheet': sheet_name})])
+        simulation_queue.put(('done', result))
+    except SimulationCancelled:
+        discard_incomplete_run(run_dir)
+        simulation_queue.put(('cancelled', None))
+    except Exception as e:
+        discard_incomplete_run(run_dir)
+        simulation_queue.put(('error', e))
 
-        # Add legend
-        ax.legend()
-
-        # Clear previous canvas if it exists
-        if hasattr(run_simulation, 'canvas'):
-            run_simulation.canvas.get_tk_widget().destroy()
-
-        # Embed the plot in the Tkinter window
-        run_simulation.canvas = FigureCanvasTkAgg(fig, master=plot_frame)
-        run_simulation.canvas.draw()
-        run_simulation.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-
-        # Calculate summary statistics based on final PnL
-        final_pnl = cumulative_simulations[:, -1]
-        mean_final_pnl = np.mean(final_pnl)
-        percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99]
-        final_pnl_percentiles = np.percentile(final_pnl, percentiles)
-
-        # 기본 전략에 대한 계산
-        cumulative_returns_base = initial_value + np.cumsum(returns)  # 기본 전략의 누적 수익률
-        final_value_base = cumulative_returns_base.iloc[-1]  # 기본 전략의 최종 누적 수익률
-
-        # 기본 전략의 승률 계산 수정
-        profitable_days = np.sum(returns > 0)
-        non_zero_days = np.sum(returns != 0)
-        winning_probability_base = profitable_days / non_zero_days if non_zero_days != 0 else 0
-
-        # 기본 전략의 손익비
-        positive_returns_base = returns[returns > 0]
-        negative_returns_base = returns[returns < 0]
-        average_profit_base = np.mean(positive_returns_base) if len(positive_returns_base) > 0 else 0
-        average_loss_base = np.mean(negative_returns_base) if len(negative_returns_base) > 0 else 0
-        profit_loss_ratio_base = average_profit_base / abs(average_loss_base) if average_loss_base != 0 else float('inf')
-
-        # 기본 전략의 샤프 비율
-        average_return_base = np.mean(returns)
-        std_dev_return_base = np.std(returns)
-        sharpe_ratio_base = average_return_base / std_dev_return_base * np.sqrt(252 / 12) if std_dev_return_base != 0 else float('inf')
-
-        # 기본 전략의 CAGR
-        years = num_days / 252  # Typical trading year assumption: 252 trading days in a year
-        if final_value_base > initial_value:
-            cagr_base = (final_value_base / initial_value)**(1/years) - 1
+# Function to start a walk-forward run (rolling windows) on a background thread
+def run_walk_forward():
+    try:
+        # Get inputs from the entries (Tk widgets must only be read on the main thread)
+        file_path = file_path_entry.get()
+        sheet_name = sheet_name_entry.get()
+        num_simulations = int(simulation_entry.get())
+        initial_value = float(initial_value_entry.get())
+        seed = int(seed_entry.get()) if seed_entry.get() else None
+        window_text = simpledialog.askstring("워크포워드", "창 길이/이동 간격 (거래일):", initialvalue="252/21",
+                                             parent=app)
+        if window_text is None:
+            return
+        window_days, step_days = (int(part) for part in window_text.split('/'))
+        resampling = read_resampling()
+    except Exception as e:
+        messagebox.showerror("오류", str(e))
+        return
+
+    cancel_event.clear()
+    run_button.config(state=tk.DISABLED)
+    walk_forward_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL)
+    progress_bar.config(value=0)
+
+    worker = threading.Thread(target=walk_forward_worker, daemon=True,
+                              args=(file_path, sheet_name, num_simulations, initial_value, seed, window_days,
+                                    step_days, resampling))
+    worker.start()
+    app.after(100, poll_simulation_queue)
+
+# Function running on the worker thread for a walk-forward run
+def walk_forward_worker(file_path, sheet_name, num_simulations, initial_value, seed, window_days, step_days,
+                        resampling=None):
+    resampling = resampling or {}
+    try:
+        # 시트를 여러 개 입력하면 날짜로 맞춘 포트폴리오 합계의 추이를 봄
+        sheet_names = [name.strip() for name in sheet_name.split(',') if name.strip()]
+        if len(sheet_names) > 1:
+            returns = load_portfolio_returns([(file_path, name) for name in sheet_names]).sum(axis=1).to_numpy()
+            sheet_name = PORTFOLIO_NAME
         else:
-            cagr_base = 0
-
-        # 기본 전략의 MDD
-        running_max_base = np.maximum.accumulate(cumulative_returns_base)
-        drawdown_base = (running_max_base - cumulative_returns_base) / running_max_base
-        drawdown_base[running_max_base == 0] = 0  # Ensure no division by zero issues
-        max_drawdown_base = np.max(drawdown_base)
-
-        # 기본 전략의 최대 underwater 기간
-        max_underwater_period_base = max_underwater_period(cumulative_returns_base)
-
-        # 기본 전략의 보상비율
-        reward_ratio_base = final_value_base / abs(np.max(running_max_base - cumulative_returns_base)) if max_drawdown_base != 0 else float('inf')
-
-        # 몬테카를로 시뮬레이션에서 개별 지표의 중앙값 및 분위 계산
-        win_probabilities_mc = []
-        profit_loss_ratios_mc = []
-        sharpe_ratios_mc = []
-        cagr_mc = []
-        max_drawdowns_mc = []
-        max_underwater_periods_mc = []
-        reward_ratios_mc = []
-
-        for sim in range(num_simulations):
-            sim_daily_returns = simulation_daily_returns[sim]
-            sim_cumulative_returns = initial_value + np.cumsum(sim_daily_returns)
-            final_pnl_sim = sim_cumulative_returns[-1]
-
-            # 승률 계산
-            sim_profitable_days = np.sum(sim_daily_returns > 0)
-            sim_non_zero_days = np.sum(sim_daily_returns != 0)
-            win_probabilities_mc.append(sim_profitable_days / sim_non_zero_days if sim_non_zero_days != 0 else 0)
-
-            # 손익비 계산
-            sim_positive_returns = sim_daily_returns[sim_daily_returns > 0]
-            sim_negative_returns = sim_daily_returns[sim_daily_returns < 0]
-            average_profit_mc = np.mean(sim_positive_returns) if len(sim_positive_returns) > 0 else 0
-            average_loss_mc = np.mean(sim_negative_returns) if len(sim_negative_returns) > 0 else 0
-            profit_loss_ratios_mc.append(average_profit_mc / abs(average_loss_mc) if average_loss_mc != 0 else float('inf'))
-
-            # 샤프 비율 계산
-            mean_return_mc = np.mean(sim_daily_returns)
-            std_dev_return_mc = np.std(sim_daily_returns)
-            sharpe_ratios_mc.append(mean_return_mc / std_dev_return_mc * np.sqrt(252 / 12) if std_dev_return_mc != 0 else float('inf'))
-
-            # CAGR 계산
-            if final_pnl_sim > initial_value:
-                cagr_value = (final_pnl_sim / initial_value)**(1/years) - 1
-            else:
-                cagr_value = 0
-            cagr_mc.append(cagr_value)
-
-            # MDD 계산
-            sim_running_max = np.maximum.accumulate(sim_cumulative_returns)
-            sim_drawdown = (sim_running_max - sim_cumulative_returns) / sim_running_max
-            sim_drawdown[sim_running_max == 0] = 0  # Ensure no division by zero issues
-            max_drawdowns_mc.append(np.max(sim_drawdown))
-
-            # 최대 underwater 기간 계산
-            max_underwater_periods_mc.append(max_underwater_period(sim_cumulative_returns))
-
-            # 보상비율 계산
-            reward_ratios_mc.append(final_pnl_sim / abs(np.max(sim_running_max - sim_cumulative_returns)) if np.max(sim_drawdown) != 0 else float('inf'))
-
-        # 각 지표의 중앙값 및 분위 계산
-        win_probability_percentiles = np.percentile(win_probabilities_mc, percentiles)
-        mean_win_probability = np.mean(win_probabilities_mc)
-
-        profit_loss_ratio_percentiles = np.percentile(profit_loss_ratios_mc, percentiles)
-        mean_profit_loss_ratio = np.mean(profit_loss_ratios_mc)
-
-        sharpe_ratio_percentiles = np.percentile(sharpe_ratios_mc, percentiles)
-        mean_sharpe_ratio = np.mean(sharpe_ratios_mc)
-
-        cagr_percentiles = np.percentile(cagr_mc, percentiles)
-        mean_cagr = np.mean(cagr_mc)
-
-        max_drawdown_percentiles = np.flip(np.percentile(max_drawdowns_mc, percentiles)) # MDD는 내림차순
-        mean_max_drawdown = np.mean(max_drawdowns_mc)
-
-        max_underwater_period_percentiles = np.flip(np.percentile(max_underwater_periods_mc, percentiles)) # underwater는 내림차순
-        mean_max_underwater_period = np.mean(max_underwater_periods_mc)
-
-        reward_ratio_percentiles = np.percentile(reward_ratios_mc, percentiles)
-        mean_reward_ratio = np.mean(reward_ratios_mc)
-
-        # Clear the previous results in Treeview
-        for item in results_table.get_children():
-            results_table.delete(item)
-
-        # Insert new results into the Treeview with the new format
-        formatted_results = [
-            ("최종 PnL", 
-                f"{final_value_base:.2f}", 
-                f"{mean_final_pnl:.2f}", 
-                f"{final_pnl_percentiles[0]:.2f}",  # 1% 분위
-                f"{final_pnl_percentiles[1]:.2f}",  # 5% 분위
-                f"{final_pnl_percentiles[2]:.2f}",  # 10% 분위
-                f"{final_pnl_percentiles[3]:.2f}",  # 25% 분위
-                f"{final_pnl_percentiles[4]:.2f}",  # 50% 분위
-                f"{final_pnl_percentiles[5]:.2f}",  # 75% 분위
-                f"{final_pnl_percentiles[6]:.2f}",  # 90% 분위
-                f"{final_pnl_percentiles[7]:.2f}",  # 95% 분위
-                f"{final_pnl_percentiles[8]:.2f}"   # 99% 분위
-            ),
-            ("승률", 
-                f"{winning_probability_base:.2%}", 
-                f"{mean_win_probability:.2%}", 
-                f"{win_probability_percentiles[0]:.2%}",  # 1% 분위
-                f"{win_probability_percentiles[1]:.2%}",  # 5% 분위
-                f"{win_probability_percentiles[2]:.2%}",  # 10% 분위
-                f"{win_probability_percentiles[3]:.2%}",  # 25% 분위
-                f"{win_probability_percentiles[4]:.2%}",  # 50% 분위
-                f"{win_probability_percentiles[5]:.2%}",  # 75% 분위
-                f"{win_probability_percentiles[6]:.2%}",  # 90% 분위
-                f"{win_probability_percentiles[7]:.2%}",  # 95% 분위
-                f"{win_probability_percentiles[8]:.2%}"   # 99% 분위
-            ),
-            ("평균 손익비", 
-                f"{profit_loss_ratio_base:.2f}", 
-                f"{mean_profit_loss_ratio:.2f}", 
-                f"{profit_loss_ratio_percentiles[0]:.2f}",  # 1% 분위
-                f"{profit_loss_ratio_percentiles[1]:.2f}",  # 5% 분위
-                f"{profit_loss_ratio_percentiles[2]:.2f}",  # 10% 분위
-                f"{profit_loss_ratio_percentiles[3]:.2f}",  # 25% 분위
-                f"{profit_loss_ratio_percentiles[4]:.2f}",  # 50% 분위
-                f"{profit_loss_ratio_percentiles[5]:.2f}",  # 75% 분위
-                f"{profit_loss_ratio_percentiles[6]:.2f}",  # 90% 분위
-                f"{profit_loss_ratio_percentiles[7]:.2f}",  # 95% 분위
-                f"{profit_loss_ratio_percentiles[8]:.2f}"   # 99% 분위
-            ),
-            ("CAGR", 
-                f"{cagr_base:.2%}", 
-                f"{mean_cagr:.2%}", 
-                f"{cagr_percentiles[0]:.2%}",  # 1% 분위
-                f"{cagr_percentiles[1]:.2%}",  # 5% 분위
-                f"{cagr_percentiles[2]:.2%}",  # 10% 분위
-                f"{cagr_percentiles[3]:.2%}",  # 25% 분위
-                f"{cagr_percentiles[4]:.2%}",  # 50% 분위
-                f"{cagr_percentiles[5]:.2%}",  # 75% 분위
-                f"{cagr_percentiles[6]:.2%}",  # 90% 분위
-                f"{cagr_percentiles[7]:.2%}",  # 95% 분위
-                f"{cagr_percentiles[8]:.2%}"   # 99% 분위
-            ),
-            ("최대 낙폭 (MDD)", 
-                f"{max_drawdown_base:.2%}", 
-                f"{mean_max_drawdown:.2%}", 
-                f"{max_drawdown_percentiles[0]:.2%}",  # 1% 분위
-                f"{max_drawdown_percentiles[1]:.2%}",  # 5% 분위
-                f"{max_drawdown_percentiles[2]:.2%}",  # 10% 분위
-                f"{max_drawdown_percentiles[3]:.2%}",  # 25% 분위
-                f"{max_drawdown_percentiles[4]:.2%}",  # 50% 분위
-                f"{max_drawdown_percentiles[5]:.2%}",  # 75% 분위
-                f"{max_drawdown_percentiles[6]:.2%}",  # 90% 분위
-                f"{max_drawdown_percentiles[7]:.2%}",  # 95% 분위
-                f"{max_drawdown_percentiles[8]:.2%}"   # 99% 분위
-            ),
-            ("월 샤프 비율", 
-                f"{sharpe_ratio_base:.2f}", 
-                f"{mean_sharpe_ratio:.2f}", 
-                f"{sharpe_ratio_percentiles[0]:.2f}",  # 1% 분위
-                f"{sharpe_ratio_percentiles[1]:.2f}",  # 5% 분위
-                f"{sharpe_ratio_percentiles[2]:.2f}",  # 10% 분위
-                f"{sharpe_ratio_percentiles[3]:.2f}",  # 25% 분위
-                f"{sharpe_ratio_percentiles[4]:.2f}",  # 50% 분위
-                f"{sharpe_ratio_percentiles[5]:.2f}",  # 75% 분위
-                f"{sharpe_ratio_percentiles[6]:.2f}",  # 90% 분위
-                f"{sharpe_ratio_percentiles[7]:.2f}",  # 95% 분위
-                f"{sharpe_ratio_percentiles[8]:.2f}"   # 99% 분위
-            ),
-            ("보상비율", 
-                f"{reward_ratio_base:.2f}", 
-                f"{mean_reward_ratio:.2f}", 
-                f"{reward_ratio_percentiles[0]:.2f}",  # 1% 분위
-                f"{reward_ratio_percentiles[1]:.2f}",  # 5% 분위
-                f"{reward_ratio_percentiles[2]:.2f}",  # 10% 분위
-                f"{reward_ratio_percentiles[3]:.2f}",  # 25% 분위
-                f"{reward_ratio_percentiles[4]:.2f}",  # 50% 분위
-                f"{reward_ratio_percentiles[5]:.2f}",  # 75% 분위
-                f"{reward_ratio_percentiles[6]:.2f}",  # 90% 분위
-                f"{reward_ratio_percentiles[7]:.2f}",  # 95% 분위
-                f"{reward_ratio_percentiles[8]:.2f}"   # 99% 분위
-            ),
-            ("최대 underwater 기간", 
-                f"{math.ceil(max_underwater_period_base)} 일", 
-                f"{math.ceil(mean_max_underwater_period)} 일", 
-                f"{math.ceil(max_underwater_period_percentiles[0])} 일",  # 1% 분위
-                f"{math.ceil(max_underwater_period_percentiles[1])} 일",  # 5% 분위
-                f"{math.ceil(max_underwater_period_percentiles[2])} 일",  # 10% 분위
-                f"{math.ceil(max_underwater_period_percentiles[3])} 일",  # 25% 분위
-                f"{math.ceil(max_underwater_period_percentiles[4])} 일",  # 50% 분위
-                f"{math.ceil(max_underwater_period_percentiles[5])} 일",  # 75% 분위
-                f"{math.ceil(max_underwater_period_percentiles[6])} 일",  # 90% 분위
-                f"{math.ceil(max_underwater_period_percentiles[7])} 일",  # 95% 분위
-                f"{math.ceil(max_underwater_period_percentiles[8])} 일"   # 99% 분위
-            )
-        ]
-
-        # Set new headings
-        for col in columns:
-            results_table.heading(col, text=col)
-
-        # Insert new formatted results into the Treeview
-        for result in formatted_results:
-            if result[0] == "기본 전략":
-                # For basic strategy, only insert up to the '평균' value
-                results_table.insert("", "end", values=(result[0], result[1], result[2], "", "", "", "", "", "", "", ""))
+            returns, sheet_name = load_returns(file_path, sheet_name)
+        num_windows = len(range(0, len(returns) - window_days + 1, max(step_days, 1)))
+        simulation_queue.put(('maximum', max(num_windows, 1) * num_simulations))
+        table = walk_forward(returns, window_days, step_days, num_simulations, initial_value, seed=seed,
+                             cancel_event=cancel_event, **resampling,
+                             progress_callback=lambda num_paths: simulation_queue.put(('progress', num_paths)))
+        simulation_queue.put(('walk_forward', (table, sheet_name)))
+    except SimulationCancelled:
+        simulation_queue.put(('cancelled', None))
+    except Exception as e:
+        simulation_queue.put(('error', e))
+
+# Function to show a walk-forward table as time series in a separate window
+def show_walk_forward(table, sheet_name):
+    from matplotlib.figure import Figure
+
+    window = tk.Toplevel(app)
+    window.title(f"{sheet_name} 워크포워드")
+    figure = Figure(figsize=(10, 8))
+    draw_walk_forward(figure, table, f'{sheet_name}에 대한 워크포워드 몬테카를로 시뮬레이션')
+    figure.tight_layout()
+    canvas = FigureCanvasTkAgg(figure, master=window)
+    canvas.draw()
+    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+# Function to poll the worker queue from the Tk main loop
+def poll_simulation_queue():
+    try:
+        while True:
+            message, payload = simulation_queue.get_nowait()
+            if message == 'progress':
+                progress_bar.step(payload)
+                continue
+            if message == 'maximum':
+                progress_bar.config(maximum=payload)
+                continue
+
+            run_button.config(state=tk.NORMAL)
+            walk_forward_button.config(state=tk.NORMAL)
+            cancel_button.config(state=tk.DISABLED)
+            if message == 'done':
+                progress_bar.config(value=progress_bar.cget('maximum'))
+                show_results(payload)
+            elif message == 'walk_forward':
+                progress_bar.config(value=progress_bar.cget('maximum'))
+                show_walk_forward(*payload)
+            elif message == 'error':
+                progress_bar.config(value=0)
+                messagebox.showerror("오류", str(payload))
             else:
-                # For Monte Carlo, insert all values
-                results_table.insert("", "end", values=result)
+                progress_bar.config(value=0)
+            return
+    except queue.Empty:
+        pass
+    app.after(100, poll_simulation_queue)
+
+# Function to cancel the running simulation
+def cancel_simulation():
+    cancel_event.set()
+    cancel_button.config(state=tk.DISABLED)
+
+# Function to show the results of a simulation in the plot and the Treeview
+def show_results(result, comparison=None):
+    """ result is a SimulationResult, or the dict of a portfolio run whose last entry (the combined
+    portfolio) is plotted and whose strategies each get their own rows in the table. comparison is
+    an optional dict of name -> SimulationResult (a stored run) overlaid and appended to the table. """
+    try:
+        results = result if isinstance(result, dict) else {None: result}
+        result = list(results.values())[-1]
+        comparison_result = list(comparison.values())[-1] if comparison else None
+        results = dict(results, **comparison) if comparison else results
+
+        # Update the persistent plot in place, decimated to the width of the canvas in pixels
+        canvas_widget = plot_canvas.get_tk_widget()
+        if not canvas_widget.winfo_ismapped():
+            canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        figure = simulation_plot.figure
+        with profile_stage(result.profile, 'plot'):
+            simulation_plot.update(result, max_points=int(figure.get_figwidth() * figure.dpi),
+                                   comparison=comparison_result)
+            plot_canvas.draw()
+
+        with profile_stage(result.profile, 'summary', result.num_simulations):
+            fill_results_table(results)
+
+        # Show the per-stage timing summary under the table
+        if result.profile is not None:
+            status_var.set(" | ".join(filter(None, [result.convergence_summary(), result.profile.summary_line()])))
+        show_results.last_result = result
+
+        # 초기 자본 슬라이더를 이번 실행의 자본 주변으로 맞춤 (슬라이더를 움직이면 표만 다시 계산)
+        show_results.last_results = results
+        capital_scale.config(from_=max(1, round(result.initial_value / 4)), to=round(result.initial_value * 4))
+        capital_scale.set(result.initial_value)
+        # 슬라이더는 정수 단위이므로 코드가 옮긴 위치 (반올림된 자본) 에서는 표를 다시 계산하지 않음
+        show_results.slider_value = capital_scale.get()
+
+    except Exception as e:
+        messagebox.showerror("오류", str(e))
 
+# Function to fill the Treeview with the results tables of a run, one block of rows per strategy
+def fill_results_table(results):
+    # Clear the previous results in Treeview
+    for item in results_table.get_children():
+        results_table.delete(item)
+
+    # Set new headings
+    for col in columns:
+        results_table.heading(col, text=col)
+
+    # Insert new formatted results into the Treeview
+    formatted_rows = [(f"{name} · {row[0]}",) + row[1:] if name is not None else row
+                      for name, strategy_result in results.items()
+                      for row in strategy_result.formatted_rows()]
+    results_table.config(height=min(len(formatted_rows), 24))
+    for result_row in formatted_rows:
+        results_table.insert("", "end", values=result_row)
+
+# Function to re-evaluate the results table for the initial capital of the slider, without simulating again
+def on_capital_slider(value):
+    results = getattr(show_results, 'last_results', None)
+    if results is None:
+        return
+    if float(value) == show_results.slider_value:  # 실행 (또는 저장된 실행) 의 결과 그대로
+        fill_results_table(results)
+        return
+    # 자본 스윕 정보 (낙폭 경계) 가 없는 실행 (--sweep-capital 없이 저장한 CLI 실행) 은 저장된 결과를 그대로 표시
+    swept = {name: 'drawdown_frontier_count' in result.metrics for name, result in results.items()}
+    try:
+        fill_results_table({name: result.with_capital(float(value), result.multiplier) if swept[name] else result
+                            for name, result in results.items()})
+    except Exception as e:
+        status_var.set(str(e))
+        return
+    if not all(swept.values()):
+        status_var.set("초기 자본 스윕 정보가 없는 실행은 저장된 결과를 그대로 표시합니다.")
+
+# Function to pick one or two stored runs and show them, the second overlaid on the first
+def open_stored_runs():
+    try:
+        runs = list_runs()
+        if not runs:
+            messagebox.showinfo("저장된 실행", "저장된 실행이 없습니다.")
+            return
     except Exception as e:
         messagebox.showerror("오류", str(e))
+        return
+
+    window = tk.Toplevel(app)
+    run_list = tk.Listbox(window, selectmode=tk.MULTIPLE, width=100, height=min(len(runs), 20))
+    run_list.pack(side=tk.TOP, fill=tk.BOTH, expand=1, padx=10, pady=3)
+
+    def fill_run_list():
+        run_list.delete(0, tk.END)
+        total_size = 0
+        for run in runs:
+            size = run_size(run['run_dir'])
+            total_size += size
+            paths_text = ", 경로 저장" if run['has_paths'] else ""
+            bands_text = ", 밴드 없음" if run.get('sketch_total') is None else ""
+            run_list.insert(tk.END, f"{run['created']}  {run['sheet_name']}  {run['num_simulations']}회 "
+                                    f"{run['num_days']}일  초기 자본 {run['initial_value']:g}{paths_text}{bands_text}"
+                                    f"  ({size / 1024**2:.1f} MB)")
+        window.title(f"저장된 실행 비교 (최대 2개 선택) - {len(runs)}개, {total_size / 1024**2:.0f} MB "
+                     f"(최대 {RUNS_MAX_BYTES / 1024**3:g} GB, 오래된 실행부터 자동 삭제)")
+
+    fill_run_list()
+
+    def load_selected():
+        selection = run_list.curselection()
+        if not 1 <= len(selection) <= 2:
+            messagebox.showinfo("저장된 실행", "실행을 1개 또는 2개 선택하세요.", parent=window)
+            return
+        try:
+            # 메모리 매핑으로 열기만 하므로 다시 계산하지 않음
+            stored = [(f"{runs[i]['sheet_name']} ({runs[i]['created']})", open_run(runs[i]['run_dir']))
+                      for i in selection]
+        except Exception as e:
+            messagebox.showerror("오류", str(e), parent=window)
+            return
+        window.destroy()
+        show_results(dict(stored[:1]), dict(stored[1:]) or None)
+
+    def delete_selected():
+        selection = run_list.curselection()
+        if not selection or not messagebox.askyesno("저장된 실행", f"선택한 실행 {len(selection)}개를 삭제할까요?",
+                                                    parent=window):
+            return
+        try:
+            for i in selection:
+                delete_run(runs[i]['run_dir'])
+        except Exception as e:
+            messagebox.showerror("오류", str(e), parent=window)
+        runs[:] = list_runs()
+        fill_run_list()
+
+    buttons = tk.Frame(window)
+    buttons.pack(side=tk.TOP, pady=3)
+    tk.Button(buttons, text="불러오기", command=load_selected).pack(side=tk.LEFT, padx=10)
+    tk.Button(buttons, text="선택 삭제", command=delete_selected).pack(side=tk.LEFT, padx=10)
 
 # Function to open file dialog
 def open_file_dialog():
@@ -386,9 +2106,24 @@ def copy_results_to_clipboard():
     except Exception as e:
         messagebox.showerror("오류", str(e))
 
+# Function to save the per-stage profile of the last run as JSON
+def save_profile_json():
+    try:
+        result = getattr(show_results, 'last_result', None)
+        if result is None or result.profile is None:
+            messagebox.showinfo("프로파일", "먼저 시뮬레이션을 실행하세요.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="profile.json",
+                                                 filetypes=[("JSON 파일", "*.json")])
+        if file_path:
+            result.profile.save_json(file_path)
+    except Exception as e:
+        messagebox.showerror("오류", str(e))
+
 # Define the function to handle window close event
 def on_closing():
     if messagebox.askokcancel("종료", "프로그램을 종료하시겠습니까?"):
+        cancel_event.set()  # Stop a running simulation before closing
         app.destroy()  # Completely close the application
 
 # Function to get the resource path
@@ -400,76 +2135,162 @@ def resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(sys.argv[0]))  # Fallback for normal script execution
     return os.path.join(base_path, relative_path)
 
-# Set up the main application window
-app = tk.Tk()
-app.title("몬테카를로 시뮬레이션 GUI")
-
-# 아이콘 설정 (같은 디렉토리에 저장)
-icon_path = resource_path("logo.ico")  # 수정된 부분
-app.iconbitmap(icon_path)
-
-# Create and place widgets
-file_path_entry = tk.Entry(app, width=50)
-file_path_entry.grid(row=0, column=1, padx=10, pady=3)
-
-browse_button = tk.Button(app, text="파일 찾기", command=open_file_dialog)
-browse_button.grid(row=0, column=2, padx=10, pady=3)
-
-tk.Label(app, text="엑셀 파일 경로:").grid(row=0, column=0, padx=10, pady=3)
-
-tk.Label(app, text="시트 이름 (선택사항):").grid(row=1, column=0, padx=10, pady=3)
-sheet_name_entry = tk.Entry(app, width=50)
-sheet_name_entry.grid(row=1, column=1, padx=10, pady=3)
-
-tk.Label(app, text="초기 자본 (초기 자본금/거래승수, 단위: Pt):").grid(row=2, column=0, padx=10, pady=3)
-initial_value_entry = tk.Entry(app, width=50)
-initial_value_entry.insert(0, "4000")  # Set default value to 4000
-initial_value_entry.grid(row=2, column=1, padx=10, pady=3)
-
-tk.Label(app, text="시뮬레이션 횟수:").grid(row=3, column=0, padx=10, pady=3)
-simulation_entry = tk.Entry(app, width=50)
-simulation_entry.insert(0, "1000")  # Set default value to 1000
-simulation_entry.grid(row=3, column=1, padx=10, pady=3)
-
-run_button = tk.Button(app, text="시뮬레이션 실행", command=run_simulation)
-run_button.grid(row=2, column=2, padx=10, pady=3)
-
-# Add a button to copy results to clipboard
-copy_button = tk.Button(app, text="결과를 클립보드에 복사", command=copy_results_to_clipboard)
-copy_button.grid(row=3, column=2, padx=10, pady=3)
-
-# Create Treeview widget to display results in a table format
-columns = ("지표", "기본전략", "평균", "1% 분위", "5% 분위", "10% 분위", "25% 분위", "50% 분위", "75% 분위", "90% 분위", "95% 분위", "99% 분위")
-results_table = ttk.Treeview(app, columns=columns, show='headings', height=8)
-results_table.grid(row=4, column=0, columnspan=3, padx=10, pady=3)
-
-# Define headings and set column width
-column_widths = {
-    "지표": 150,
-    "기본전략": 100,
-    "평균": 100,
-    "1% 분위": 100,
-    "5% 분위": 100,
-    "10% 분위": 100,
-    "25% 분위": 100,
-    "50% 분위": 100,
-    "75% 분위": 100,
-    "90% 분위": 100,
-    "95% 분위": 100,
-    "99% 분위": 100,
-}
-
-# Define headings
-for col in columns:
-    results_table.heading(col, text=col)
-    results_table.column(col, width=column_widths[col], anchor=tk.CENTER)
-
-# Frame to hold the plot
-plot_frame = tk.Frame(app)
-plot_frame.grid(row=5, column=0, columnspan=3, padx=10, pady=3)
-
-# Set the protocol for window close button to call the on_closing function
-app.protocol("WM_DELETE_WINDOW", on_closing)
-
-# Start the application
-app.mainloop()
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Required for the process pool in PyInstaller builds
+
+    # Batch mode when command line arguments are given, GUI otherwise
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, simpledialog, ttk
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import seaborn as sns
+
+    # Set up the main application window
+    app = tk.Tk()
+    app.title("몬테카를로 시뮬레이션 GUI")
+
+    # 아이콘 설정 (같은 디렉토리에 저장)
+    icon_path = resource_path("logo.ico")  # 수정된 부분
+    app.iconbitmap(icon_path)
+
+    # Create and place widgets
+    file_path_entry = tk.Entry(app, width=50)
+    file_path_entry.grid(row=0, column=1, padx=10, pady=3)
+
+    browse_button = tk.Button(app, text="파일 찾기", command=open_file_dialog)
+    browse_button.grid(row=0, column=2, padx=10, pady=3)
+
+    tk.Label(app, text="엑셀 파일 경로:").grid(row=0, column=0, padx=10, pady=3)
+
+    tk.Label(app, text="시트 이름 (선택사항, 쉼표로 여러 개: 포트폴리오):").grid(row=1, column=0, padx=10, pady=3)
+    sheet_name_entry = tk.Entry(app, width=50)
+    sheet_name_entry.grid(row=1, column=1, padx=10, pady=3)
+
+    tk.Label(app, text="초기 자본 (초기 자본금/거래승수, 단위: Pt):").grid(row=2, column=0, padx=10, pady=3)
+    initial_value_entry = tk.Entry(app, width=50)
+    initial_value_entry.insert(0, "4000")  # Set default value to 4000
+    initial_value_entry.grid(row=2, column=1, padx=10, pady=3)
+
+    tk.Label(app, text="시뮬레이션 횟수:").grid(row=3, column=0, padx=10, pady=3)
+    simulation_entry = tk.Entry(app, width=50)
+    simulation_entry.insert(0, "1000")  # Set default value to 1000
+    simulation_entry.grid(row=3, column=1, padx=10, pady=3)
+
+    tk.Label(app, text="시드 (선택사항):").grid(row=4, column=0, padx=10, pady=3)
+    seed_entry = tk.Entry(app, width=50)
+    seed_entry.grid(row=4, column=1, padx=10, pady=3)
+
+    tk.Label(app, text=f"병렬 작업 수 (코어 {os.cpu_count() or 1}개):").grid(row=5, column=0, padx=10, pady=3)
+    workers_entry = tk.Entry(app, width=50)
+    # 프로세스 풀 시작 비용이 작은 실행보다 크고, 결과가 작업자 수에 따라 달라지므로 기본값은 1
+    workers_entry.insert(0, "1")
+    workers_entry.grid(row=5, column=1, padx=10, pady=3)
+
+    tk.Label(app, text="수렴 허용오차 (선택사항, 예: 0.02):").grid(row=6, column=0, padx=10, pady=3)
+    tolerance_entry = tk.Entry(app, width=50)  # 입력하면 시뮬레이션 횟수를 최대 횟수로 보고 분위가 안정되면 중단
+    tolerance_entry.grid(row=6, column=1, padx=10, pady=3)
+
+    run_button = tk.Button(app, text="시뮬레이션 실행", command=run_simulation)
+    run_button.grid(row=2, column=2, padx=10, pady=3)
+
+    # Add a button to copy results to clipboard
+    copy_button = tk.Button(app, text="결과를 클립보드에 복사", command=copy_results_to_clipboard)
+    copy_button.grid(row=3, column=2, padx=10, pady=3)
+
+    # Add a button to save the per-stage profile of the last run
+    profile_button = tk.Button(app, text="프로파일 JSON 저장", command=save_profile_json)
+    profile_button.grid(row=1, column=2, padx=10, pady=3)
+
+    # Cancel button and progress bar for the running simulation
+    cancel_button = tk.Button(app, text="시뮬레이션 취소", command=cancel_simulation, state=tk.DISABLED)
+    cancel_button.grid(row=4, column=2, padx=10, pady=3)
+
+    progress_bar = ttk.Progressbar(app, orient=tk.HORIZONTAL, mode='determinate', length=200)
+    progress_bar.grid(row=5, column=2, padx=10, pady=3)
+
+    # Button to simulate rolling windows of the series and plot how the percentiles change over time
+    walk_forward_button = tk.Button(app, text="워크포워드 실행", command=run_walk_forward)
+    walk_forward_button.grid(row=6, column=2, padx=10, pady=3)
+
+    # Every run is saved to the run store; optionally with its full path matrix, memory-mapped on reopening
+    save_paths_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(app, text="경로 행렬 저장", variable=save_paths_var).grid(row=0, column=3, padx=10, pady=3)
+    compare_button = tk.Button(app, text="저장된 실행 비교", command=open_stored_runs)
+    compare_button.grid(row=1, column=3, padx=10, pady=3)
+
+    # Address of a local job server (montecarlo_server.py); when given, runs are submitted to it
+    tk.Label(app, text="작업 서버 (선택사항):").grid(row=2, column=3, padx=10, pady=3)
+    server_entry = tk.Entry(app, width=30)
+    server_entry.grid(row=3, column=3, padx=10, pady=3)
+
+    # Resampling scheme of the days and the (mean) block length of the block schemes
+    tk.Label(app, text="리샘플링 / 블록 길이 (일):").grid(row=4, column=3, padx=10, pady=3)
+    resampling_frame = tk.Frame(app)
+    resampling_frame.grid(row=5, column=3, padx=10, pady=3)
+    resampling_combobox = ttk.Combobox(resampling_frame, values=list(RESAMPLING_METHODS.values()), state='readonly',
+                                       width=20)
+    resampling_combobox.current(0)
+    resampling_combobox.pack(side=tk.LEFT)
+    block_length_entry = tk.Entry(resampling_frame, width=6)
+    block_length_entry.insert(0, str(DEFAULT_BLOCK_LENGTH))
+    block_length_entry.pack(side=tk.LEFT, padx=(5, 0))
+
+    # The worker thread sends ('progress' | 'done' | 'cancelled' | 'error', payload) messages through this queue
+    simulation_queue = queue.Queue()
+    cancel_event = threading.Event()
+
+    # Create Treeview widget to display results in a table format
+    columns = ("지표", "기본전략", "평균", "1% 분위", "5% 분위", "10% 분위", "25% 분위", "50% 분위", "75% 분위", "90% 분위", "95% 분위", "99% 분위")
+    results_table = ttk.Treeview(app, columns=columns, show='headings', height=8)
+    results_table.grid(row=7, column=0, columnspan=4, padx=10, pady=3)
+
+    # Status bar with the per-stage timing of the last run
+    status_var = tk.StringVar()
+    status_bar = tk.Label(app, textvariable=status_var, anchor=tk.W, relief=tk.SUNKEN)
+    status_bar.grid(row=9, column=0, columnspan=4, padx=10, pady=3, sticky=tk.EW)
+
+    # Slider to re-evaluate the table for another initial capital from the paths of the last run
+    tk.Label(app, text="초기 자본 스윕 (Pt):").grid(row=8, column=0, padx=10, pady=3)
+    capital_scale = tk.Scale(app, orient=tk.HORIZONTAL, from_=1000, to=16000, showvalue=True, command=on_capital_slider)
+    capital_scale.set(4000)
+    capital_scale.grid(row=8, column=1, columnspan=3, padx=10, pady=3, sticky=tk.EW)
+
+    # Define headings and set column width
+    column_widths = {
+        "지표": 220,
+        "기본전략": 100,
+        "평균": 100,
+        "1% 분위": 100,
+        "5% 분위": 100,
+        "10% 분위": 100,
+        "25% 분위": 100,
+        "50% 분위": 100,
+        "75% 분위": 100,
+        "90% 분위": 100,
+        "95% 분위": 100,
+        "99% 분위": 100,
+    }
+
+    # Define headings
+    for col in columns:
+        results_table.heading(col, text=col)
+        results_table.column(col, width=column_widths[col], anchor=tk.CENTER)
+
+    # Frame to hold the plot
+    plot_frame = tk.Frame(app)
+    plot_frame.grid(row=10, column=0, columnspan=4, padx=10, pady=3)
+
+    # Create the figure once with seaborn style and Korean font; each run only updates its artists
+    set_korean_font()
+    sns.set_theme(style="whitegrid", font='Malgun Gothic')  # Apply seaborn whitegrid style
+    simulation_plot = SimulationPlot()
+    plot_canvas = FigureCanvasTkAgg(simulation_plot.figure, master=plot_frame)
+
+    # Set the protocol for window close button to call the on_closing function
+    app.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Start the application
+    app.mainloop()